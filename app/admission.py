@@ -0,0 +1,146 @@
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+NORMAL = "normal"
+# Cheaper pipeline: keyword retrieval, resume contact info without the LLM,
+# no email variants
+DEGRADED = "degraded"
+# Only what the result store already has; any new LLM call is refused
+CACHE_ONLY = "cache_only"
+
+# How the current request was admitted; set with admission_mode() and carried
+# into worker threads that copy the context
+_mode = contextvars.ContextVar("admission_mode", default=NORMAL)
+
+
+class Overloaded(RuntimeError):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def admission_mode(mode):
+    token = _mode.set(mode)
+    try:
+        yield
+    finally:
+        _mode.reset(token)
+
+
+def current_mode():
+    return _mode.get()
+
+
+def degraded():
+    return _mode.get() != NORMAL
+
+
+# Load shedding in front of the generation pipeline. Load is the number of
+# Chain LLM calls in flight and the recent time requests spent queued before
+# they started. Each request is admitted in the cheapest mode the load allows:
+# normal below the `degrade_*` thresholds, degraded below the `max_*` ones,
+# cache-only above them. Cache-only requests fail fast with a retry-after,
+# which drains the queue instead of letting it grow until calls time out.
+class AdmissionController:
+    def __init__(self, max_in_flight=24, degrade_in_flight=12, max_queue_seconds=20.0, degrade_queue_seconds=5.0,
+                 window_seconds=30.0, retry_after=5):
+        self.max_in_flight = max_in_flight
+        self.degrade_in_flight = degrade_in_flight
+        self.max_queue_seconds = max_queue_seconds
+        self.degrade_queue_seconds = degrade_queue_seconds
+        self.window_seconds = window_seconds
+        self.retry_seconds = retry_after
+        self.in_flight = 0
+        self._waits = deque()
+        self._lock = threading.Lock()
+        self._counts = {NORMAL: 0, DEGRADED: 0, CACHE_ONLY: 0, "refused_calls": 0}
+
+    def record_queue_wait(self, seconds):
+        with self._lock:
+            self._waits.append((time.monotonic(), seconds))
+
+    def queue_latency(self):
+        # 90th percentile of the waits seen in the last `window_seconds`, so a
+        # spike stops counting once it has passed
+        with self._lock:
+            cutoff = time.monotonic() - self.window_seconds
+            while self._waits and self._waits[0][0] < cutoff:
+                self._waits.popleft()
+            waits = sorted(seconds for _, seconds in self._waits)
+        if not waits:
+            return 0.0
+        return waits[min(int(len(waits) * 0.9), len(waits) - 1)]
+
+    def level(self):
+        latency = self.queue_latency()
+        in_flight = self.in_flight
+        if in_flight >= self.max_in_flight or latency >= self.max_queue_seconds:
+            return CACHE_ONLY
+        if in_flight >= self.degrade_in_flight or latency >= self.degrade_queue_seconds:
+            return DEGRADED
+        return NORMAL
+
+    def admit(self, queue_wait=None):
+        # Called once per request as it starts; `queue_wait` is how long it
+        # waited for a worker or a slot
+        if queue_wait is not None:
+            self.record_queue_wait(queue_wait)
+        mode = self.level()
+        with self._lock:
+            self._counts[mode] += 1
+        return mode
+
+    def retry_after(self):
+        return max(self.retry_seconds, math.ceil(self.queue_latency()))
+
+    def check(self, method):
+        # Refuses the call if the current request was admitted cache-only
+        if _mode.get() == CACHE_ONLY:
+            with self._lock:
+                self._counts["refused_calls"] += 1
+            retry_after = self.retry_after()
+            raise Overloaded(f"The service is busy; {method} was not run. Try again in {retry_after}s.", retry_after)
+
+    @contextmanager
+    def call(self, method, check=True):
+        # Wraps each Chain LLM call; `check=False` when check() already ran
+        if check:
+            self.check(method)
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        return dict(counts, in_flight=self.in_flight, queue_latency=round(self.queue_latency(), 3),
+                    level=self.level())
+
+
+_admission = None
+_admission_lock = threading.Lock()
+
+
+def get_admission():
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = AdmissionController(
+                max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "24")),
+                degrade_in_flight=int(os.getenv("ADMISSION_DEGRADE_IN_FLIGHT", "12")),
+                max_queue_seconds=float(os.getenv("ADMISSION_MAX_QUEUE_SECONDS", "20")),
+                degrade_queue_seconds=float(os.getenv("ADMISSION_DEGRADE_QUEUE_SECONDS", "5")),
+                retry_after=int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+            )
+        return _admission
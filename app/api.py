@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from admission import Overloaded, admission_mode, current_mode, degraded, get_admission
+from chains import Chain
+from ledger import BudgetExceeded, get_ledger, usage_scope
+from models import json_default
+from pipeline import fallback_resume_info, fetch_job_page, iter_pipeline
+from portfolio import Portfolio
+from project_store import ProjectStore
+from result_store import get_result_store
+
+
+SAMPLE_PORTFOLIO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resource", "personal_projects.csv")
+
+
+class ResumeRequest(BaseModel):
+    resume_text: str
+
+
+class JobTextRequest(BaseModel):
+    job_text: str
+
+
+class JobPageRequest(BaseModel):
+    page_text: Optional[str] = None
+    url: Optional[str] = None
+
+
+class PortfolioQueryRequest(BaseModel):
+    skills: List[str]
+    projects: Optional[List[Dict[str, Any]]] = None
+
+
+class GenerateRequest(BaseModel):
+    resume_text: str
+    job_text: Optional[str] = None
+    job_url: Optional[str] = None
+    projects: Optional[List[Dict[str, Any]]] = None
+    variants: int = Field(1, ge=1, le=5)
+    crawl: bool = False
+    stream: bool = False
+
+
+class ChainPool:
+    def __init__(self, chain_factory, size):
+        self._chains = asyncio.Queue()
+        for _ in range(size):
+            self._chains.put_nowait(chain_factory())
+
+    @asynccontextmanager
+    async def acquire(self):
+        chain = await self._chains.get()
+        try:
+            yield chain
+        finally:
+            self._chains.put_nowait(chain)
+
+
+# Portfolios are keyed by the hash of their projects, so repeated requests with
+# the same portfolio reuse one indexed tenant of the shared vector store.
+class PortfolioPool:
+    def __init__(self, portfolio_factory, max_size=64):
+        self.portfolio_factory = portfolio_factory
+        self.max_size = max_size
+        self._portfolios = OrderedDict()
+        self._lock = threading.Lock()
+        self._default_store = None
+
+    def _default(self):
+        if self._default_store is None:
+            import pandas as pd
+            self._default_store = ProjectStore.from_dataframe(
+                pd.read_csv(SAMPLE_PORTFOLIO_PATH, dtype=str, keep_default_na=False)
+            )
+        return self._default_store
+
+    def get(self, projects=None):
+        key = hashlib.sha1(json.dumps(projects, sort_keys=True).encode("utf-8")).hexdigest()
+        with self._lock:
+            portfolio = self._portfolios.get(key)
+            if portfolio is not None:
+                self._portfolios.move_to_end(key)
+                return portfolio
+            store = ProjectStore.from_records(projects) if projects else self._default()
+            portfolio = self.portfolio_factory(store, f"api-{key}")
+            self._portfolios[key] = portfolio
+            while len(self._portfolios) > self.max_size:
+                self._portfolios.popitem(last=False)
+            return portfolio
+
+
+def default_portfolio_factory(store, tenant_id):
+    return Portfolio(csv_data=store, tenant_id=tenant_id)
+
+
+class SlotResponse(StreamingResponse):
+    # Streams that hold an admission slot: the slot is released however the
+    # response ends, including a client that disconnects before the body starts
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+
+def chain_error(e):
+    # A session out of LLM budget should back off, not treat it as an upstream failure
+    if isinstance(e, BudgetExceeded):
+        return HTTPException(status_code=429, detail=str(e))
+    if isinstance(e, Overloaded):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return HTTPException(status_code=502, detail=str(e))
+
+
+def create_app(chain_factory=Chain, portfolio_factory=default_portfolio_factory,
+               pool_size=8, max_concurrency=32, queue_timeout=5.0, result_store=None, ledger=None, admission=None):
+    state = {}
+    ledger = ledger or get_ledger()
+    admission = admission or get_admission()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        state["chains"] = ChainPool(chain_factory, pool_size)
+        state["portfolios"] = PortfolioPool(portfolio_factory)
+        state["limit"] = asyncio.Semaphore(max_concurrency)
+        yield
+
+    app = FastAPI(title="Cold Email Generator API", lifespan=lifespan)
+
+    async def acquire_slot():
+        # Bound in-flight work; callers that wait too long get a 429 instead of
+        # piling up. The wait feeds the admission controller, which picks the
+        # mode the request runs in.
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(state["limit"].acquire(), timeout=queue_timeout)
+        except asyncio.TimeoutError:
+            admission.record_queue_wait(time.monotonic() - started)
+            raise HTTPException(status_code=429, detail="Server busy",
+                                headers={"Retry-After": str(admission.retry_after())})
+        return admission.admit(time.monotonic() - started)
+
+    @asynccontextmanager
+    async def admitted():
+        mode = await acquire_slot()
+        try:
+            with admission_mode(mode):
+                yield
+        finally:
+            state["limit"].release()
+
+    async def run_chain(method, session, *args):
+        # Called inside admitted()
+        async with state["chains"].acquire() as chain:
+            try:
+                with usage_scope(session=session):
+                    return await run_in_threadpool(getattr(chain, method), *args)
+            except Exception as e:
+                raise chain_error(e)
+
+    async def call_chain(method, session, *args, fallback=None):
+        # `fallback` answers without the LLM when the request is admitted degraded
+        async with admitted():
+            if fallback is not None and degraded():
+                return await run_in_threadpool(fallback, *args)
+            return await run_chain(method, session, *args)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "admission": admission.stats()}
+
+    @app.get("/usage")
+    async def usage(session: Optional[str] = None, batch: Optional[str] = None):
+        return ledger.summary(session=session, batch=batch)
+
+    @app.post("/resume/extract")
+    async def extract_resume(request: ResumeRequest, x_session_id: Optional[str] = Header(None)):
+        return await call_chain("extract_resume_info", x_session_id, request.resume_text, fallback=fallback_resume_info)
+
+    @app.post("/jobs/parse")
+    async def parse_job(request: JobTextRequest, x_session_id: Optional[str] = Header(None)):
+        return await call_chain("parse_job_description", x_session_id, request.job_text)
+
+    @app.post("/jobs/extract")
+    async def extract_jobs(request: JobPageRequest, x_session_id: Optional[str] = Header(None)):
+        if not request.page_text and not request.url:
+            raise HTTPException(status_code=422, detail="Provide page_text or url")
+        # The page download holds a slot like the LLM call does; a failed
+        # download is an upstream error
+        async with admitted():
+            page_text = request.page_text
+            if page_text is None:
+                try:
+                    page_text = await run_in_threadpool(fetch_job_page, request.url)
+                except Exception as e:
+                    raise chain_error(e)
+            return await run_chain("extract_jobs", x_session_id, page_text)
+
+    @app.post("/portfolio/query")
+    async def query_portfolio(request: PortfolioQueryRequest):
+        async with admitted():
+            portfolio = await run_in_threadpool(state["portfolios"].get, request.projects)
+            return await run_in_threadpool(portfolio.query_links, request.skills, degraded())
+
+    @app.post("/generate")
+    async def generate(request: GenerateRequest, x_session_id: Optional[str] = Header(None)):
+        if not request.job_text and not request.job_url:
+            raise HTTPException(status_code=422, detail="Provide job_text or job_url")
+        job_input = request.job_text or request.job_url
+        input_method = "text" if request.job_text else ("crawl" if request.crawl else "url")
+
+        if not request.stream:
+            async with admitted():
+                async with state["chains"].acquire() as chain:
+                    portfolio = await run_in_threadpool(state["portfolios"].get, request.projects)
+                    result = {"resume_info": None, "jobs": [], "ranking": [], "emails": [], "mode": current_mode()}
+                    events = iter_pipeline(chain, portfolio, request.resume_text, job_input, input_method, result_store,
+                                           request.variants)
+                    try:
+                        with usage_scope(session=x_session_id):
+                            async for event, value in iterate_in_threadpool(events):
+                                if event == "email":
+                                    result["emails"].append(value)
+                                elif event not in ("stage", "job"):
+                                    result[event] = value
+                    except Exception as e:
+                        raise chain_error(e)
+                    return result
+
+        # Streaming: admission happens up front, then one NDJSON line per pipeline event
+        mode = await acquire_slot()
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                state["limit"].release()
+
+        async def stream_events():
+            try:
+                async with state["chains"].acquire() as chain:
+                    portfolio = await run_in_threadpool(state["portfolios"].get, request.projects)
+                    events = iter_pipeline(chain, portfolio, request.resume_text, job_input, input_method, result_store,
+                                           request.variants)
+                    try:
+                        with usage_scope(session=x_session_id), admission_mode(mode):
+                            yield json.dumps({"event": "mode", "data": mode}) + "\n"
+                            async for event, value in iterate_in_threadpool(events):
+                                yield json.dumps({"event": event, "data": value}, default=json_default) + "\n"
+                    except Exception as e:
+                        error = {"event": "error", "data": str(e)}
+                        if isinstance(e, Overloaded):
+                            error["retry_after"] = e.retry_after
+                        yield json.dumps(error) + "\n"
+            finally:
+                release()
+
+        return SlotResponse(stream_events(), release, media_type="application/x-ndjson")
+
+    return app
+
+
+app = create_app(result_store=get_result_store())
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
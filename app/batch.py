@@ -0,0 +1,257 @@
+import argparse
+import contextvars
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from job_ranking import MIN_SCORE, TOP_K, score_matrix, select_jobs
+from ledger import get_ledger, usage_scope
+from models import json_default
+from pipeline import cached_jobs, load_jobs, load_resume_info, load_resume_text, store_jobs, write_email
+from result_store import content_hash
+
+
+# Portfolio version in the email cache key of candidates without projects
+NO_PORTFOLIO = "none"
+
+
+class BatchResume:
+    # `portfolio` holds this candidate's own projects; without one their
+    # emails cite no projects rather than someone else's
+    __slots__ = ("name", "data", "file_type", "portfolio")
+
+    def __init__(self, name, data, file_type=None, portfolio=None):
+        self.name = name
+        self.data = data
+        self.file_type = file_type
+        self.portfolio = portfolio
+
+
+# M resumes x N job inputs for a whole cohort. Each resume and each job input
+# is parsed once, every (resume, job) pair is scored in one matrix, and emails
+# are written only for the pairs each resume's ranking selects. All LLM work
+# shares one worker pool and is billed to the run's batch id in the ledger.
+# Projects come from each candidate's own portfolio; `embed` is the embedding
+# function for scoring, or None for keyword and experience scores only.
+class BatchRunner:
+    def __init__(self, chain, result_store=None, workers=8, ledger=None, embed=None):
+        self.chain = chain
+        self.embed = embed
+        self.result_store = result_store
+        self.workers = workers
+        self.ledger = ledger or get_ledger()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+
+    def _map(self, stage, work, items, progress):
+        # Runs work(item) on the pool in the caller's usage scope; returns
+        # results in item order, with exceptions in place of failed items
+        results = [None] * len(items)
+        futures = {
+            self._executor.submit(contextvars.copy_context().run, work, item): index
+            for index, item in enumerate(items)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+            if progress is not None:
+                progress(stage, done, len(items))
+        return results
+
+    def _parse_resume(self, resume):
+        resume_text = load_resume_text(resume.data, resume.file_type, self.result_store)
+        return content_hash(resume_text), load_resume_info(self.chain, resume_text, self.result_store)
+
+    def _load_jobs(self, job_input):
+        text, input_method = job_input
+        jobs = cached_jobs(self.result_store, text, input_method)
+        if jobs is None:
+            report = {}
+            jobs = load_jobs(self.chain, text, input_method, report)
+            store_jobs(self.result_store, text, input_method, jobs, report)
+        return jobs
+
+    def run(self, resumes, job_inputs, top_k=TOP_K, min_score=MIN_SCORE, variants=1, progress=None, batch_id=None):
+        # `job_inputs` are (text or URL, input method) pairs, as in the pipeline;
+        # `progress(stage, done, total)` is called as items finish
+        batch_id = batch_id or uuid.uuid4().hex
+        job_inputs = list(dict.fromkeys(job_inputs))
+        timings = {}
+        errors = []
+        started = time.perf_counter()
+
+        with usage_scope(batch=batch_id):
+            phase = time.perf_counter()
+            parsed = []
+            for resume, outcome in zip(resumes, self._map("resumes", self._parse_resume, resumes, progress)):
+                if isinstance(outcome, Exception):
+                    errors.append({"stage": "resumes", "input": resume.name, "error": str(outcome)})
+                else:
+                    parsed.append((resume.name, *outcome, resume.portfolio))
+            timings["resumes"] = time.perf_counter() - phase
+
+            phase = time.perf_counter()
+            jobs = []
+            seen = set()
+            for job_input, outcome in zip(job_inputs, self._map("jobs", self._load_jobs, job_inputs, progress)):
+                if isinstance(outcome, Exception):
+                    errors.append({"stage": "jobs", "input": job_input[0][:200], "error": str(outcome)})
+                    continue
+                # The same posting reached through two inputs is scored once
+                for job in outcome:
+                    job_hash = content_hash(job)
+                    if job_hash not in seen:
+                        seen.add(job_hash)
+                        jobs.append(job)
+            timings["jobs"] = time.perf_counter() - phase
+
+            phase = time.perf_counter()
+            pairs = []
+            scores = np.zeros((len(parsed), len(jobs)), dtype=np.float32)
+            if parsed and jobs:
+                scores, _ = score_matrix(jobs, [resume_info for _, _, resume_info, _ in parsed], self.embed)
+                _, selected = select_jobs(scores, top_k, min_score)
+                pairs = [(int(row), int(column)) for row, column in np.argwhere(selected)]
+            timings["scoring"] = time.perf_counter() - phase
+
+            phase = time.perf_counter()
+            portfolio_versions = {}
+            for _, _, _, portfolio in parsed:
+                if portfolio is not None and id(portfolio) not in portfolio_versions:
+                    portfolio.load_portfolio()
+                    portfolio_versions[id(portfolio)] = portfolio.store.content_hash()
+
+            def write(pair):
+                row, column = pair
+                _, resume_hash, resume_info, portfolio = parsed[row]
+                job = jobs[column]
+                if portfolio is None:
+                    # No projects of their own: the email cites none
+                    return write_email(self.chain, None, self.result_store, resume_info, resume_hash,
+                                       NO_PORTFOLIO, job, {content_hash(job): []}, variants)
+                return write_email(self.chain, portfolio, self.result_store, resume_info, resume_hash,
+                                   portfolio_versions[id(portfolio)], job, {}, variants)
+
+            emails = []
+            for (row, column), outcome in zip(pairs, self._map("emails", write, pairs, progress)):
+                if isinstance(outcome, Exception):
+                    errors.append({"stage": "emails", "input": f"{parsed[row][0]} x {jobs[column].role}",
+                                   "error": str(outcome)})
+                    continue
+                emails.append(dict(outcome, resume=parsed[row][0], job_index=column,
+                                   score=round(float(scores[row, column]), 4)))
+            timings["emails"] = time.perf_counter() - phase
+
+        elapsed = time.perf_counter() - started
+        usage = self.ledger.summary(batch=batch_id)
+        stats = {
+            "batch": batch_id,
+            "resumes": len(parsed),
+            "jobs": len(jobs),
+            "pairs_scored": int(scores.size),
+            "pairs_selected": len(pairs),
+            "emails": len(emails),
+            "cached_emails": sum(entry["cached"] for entry in emails),
+            "errors": len(errors),
+            "seconds": {name: round(value, 3) for name, value in dict(timings, total=elapsed).items()},
+            "emails_per_second": round(len(emails) / timings["emails"], 2) if timings["emails"] else 0.0,
+            "llm_calls": usage["calls"],
+            "tokens": usage["tokens"],
+            "cost": usage["cost"]
+        }
+        return {
+            "resumes": [name for name, _, _, _ in parsed],
+            "jobs": jobs,
+            "scores": scores.round(4).tolist(),
+            "emails": emails,
+            "errors": errors,
+            "stats": stats
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def _resume_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith((".pdf", ".docx", ".txt")):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main():
+    from chains import Chain
+    from documents import detect_type
+    from portfolio import Portfolio
+    from result_store import get_result_store
+
+    parser = argparse.ArgumentParser(description="Generate cold emails for many resumes against many jobs")
+    parser.add_argument("--resumes", nargs="+", required=True, help="Resume files or directories of them")
+    parser.add_argument("--jobs", nargs="*", default=[], help="Text files with one job description each")
+    parser.add_argument("--job-url", action="append", default=[], help="Careers page URL; repeatable")
+    parser.add_argument("--crawl", action="store_true", help="Crawl the careers sites instead of reading one page")
+    parser.add_argument("--projects-dir",
+                        help="Directory of <resume name>.csv project files; by default the CSV next to each resume. "
+                             "Candidates without one get emails that cite no projects")
+    parser.add_argument("--keyword-portfolio", action="store_true", help="Skip the embedding model")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE)
+    parser.add_argument("--variants", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BATCH_WORKERS", "8")))
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the result store")
+    parser.add_argument("--out", default="batch_emails.jsonl")
+    args = parser.parse_args()
+
+    resumes = []
+    for path in _resume_files(args.resumes):
+        with open(path, "rb") as f:
+            data = f.read()
+        stem = os.path.splitext(os.path.basename(path))[0]
+        projects_path = os.path.join(args.projects_dir or os.path.dirname(path), f"{stem}.csv")
+        portfolio = None
+        if os.path.exists(projects_path):
+            portfolio = Portfolio(file_path=projects_path, tenant_id=f"batch-{stem}")
+            if args.keyword_portfolio:
+                portfolio.vector_store = None
+        resumes.append(BatchResume(os.path.basename(path), data, detect_type(file_name=path), portfolio))
+    job_inputs = []
+    for path in args.jobs:
+        with open(path, encoding="utf-8") as f:
+            job_inputs.append((f.read(), "text"))
+    job_inputs += [(url, "crawl" if args.crawl else "url") for url in args.job_url]
+    if not resumes or not job_inputs:
+        parser.error("Provide at least one resume and one job")
+
+    embed = None
+    if not args.keyword_portfolio:
+        from vector_store import get_shared_store
+        embed = get_shared_store().embedding_function
+
+    def progress(stage, done, total):
+        print(f"\r{stage:<8} {done}/{total}", end="\n" if done == total else "", flush=True)
+
+    runner = BatchRunner(Chain(), None if args.no_cache else get_result_store(), args.workers, embed=embed)
+    try:
+        result = runner.run(resumes, job_inputs, args.top_k, args.min_score, args.variants, progress)
+    finally:
+        runner.shutdown()
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        for entry in result["emails"]:
+            f.write(json.dumps(entry, default=json_default) + "\n")
+    for error in result["errors"]:
+        print(f"failed {error['stage']}: {error['input']}: {error['error']}")
+    print(json.dumps(result["stats"], indent=2))
+    print(f"wrote {len(result['emails'])} emails to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
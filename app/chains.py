@@ -1,45 +1,36 @@
+import hashlib
 import os
-from langchain_groq import ChatGroq
+import time
+from contextlib import contextmanager
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.exceptions import OutputParserException
 from dotenv import load_dotenv
 
-load_dotenv()
+from admission import get_admission
+from json_repair import IncrementalJSONParser, parse_llm_json
+from ledger import get_ledger
+from models import JOB_SCHEMA, RESUME_SCHEMA, Job, Project, ResumeInfo, ValidationError, schema_prompt
+from singleflight import flight_key, get_single_flight
 
-class Chain:
-    def __init__(self):
-        self.llm = ChatGroq(
-            temperature=0.2,
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-            model_name="llama-3.3-70b-versatile"
-        )
+load_dotenv()
 
-    def extract_jobs(self, cleaned_text):
-        prompt_extract = PromptTemplate.from_template("""
+EXTRACT_JOBS_TEMPLATE = """
             ### SCRAPED TEXT FROM WEBSITE:
             {page_data}
             ### INSTRUCTION:
             The scraped text is from the career's page of a website or a job description.
-            Your job is to extract the job postings and return them in JSON format containing the following keys: `role`, `experience`, `skills`, `description`, and `company`.
+            Your job is to extract the job postings and return them as a JSON array where every item matches this JSON schema:
+            {schema}
             Only return the valid JSON.
             ### VALID JSON (NO PREAMBLE):
-        """)
-        chain_extract = prompt_extract | self.llm
-        res = chain_extract.invoke(input={"page_data": cleaned_text})
-        try:
-            json_parser = JsonOutputParser()
-            res = json_parser.parse(res.content)
-        except OutputParserException:
-            raise OutputParserException("Context too big. Unable to parse jobs.")
-        return res if isinstance(res, list) else [res]
+        """
 
-    def extract_resume_info(self, resume_text):
-        prompt_resume = PromptTemplate.from_template("""
+RESUME_TEMPLATE = """
             ### RESUME TEXT:
             {resume_text}
             ### INSTRUCTION:
-            Extract the following information from the resume and return in JSON format:
+            Extract the following information from the resume and return it as one JSON object matching this JSON schema:
+            {schema}
             - `name`: Full name of the candidate
             - `email`: Email address
             - `phone`: Phone number (if available)
@@ -50,18 +41,9 @@ class Chain:
             - `summary`: Brief professional summary or objective
             Only return the valid JSON.
             ### VALID JSON (NO PREAMBLE):
-        """)
-        chain_resume = prompt_resume | self.llm
-        res = chain_resume.invoke(input={"resume_text": resume_text})
-        try:
-            json_parser = JsonOutputParser()
-            res = json_parser.parse(res.content)
-        except OutputParserException:
-            raise OutputParserException("Unable to parse resume information.")
-        return res
+        """
 
-    def write_candidate_email(self, job, resume_info, relevant_projects):
-        prompt_email = PromptTemplate.from_template("""
+EMAIL_TEMPLATE = """
             ### JOB DESCRIPTION:
             {job_description}
 
@@ -97,34 +79,269 @@ class Chain:
             Keep the tone warm, confident, and professional. Word count: 200–300 words.
 
             ### EMAIL (NO PREAMBLE):
-        """)
-        chain_email = prompt_email | self.llm
-        res = chain_email.invoke({
-            "job_description": str(job),
-            "resume_info": str(resume_info),
-            "relevant_projects": str(relevant_projects)
-        })
-        return res.content
+        """
 
-    def parse_job_description(self, job_text):
-        prompt_parse = PromptTemplate.from_template("""
+PARSE_JOB_TEMPLATE = """
             ### JOB DESCRIPTION TEXT:
             {job_text}
             ### INSTRUCTION:
-            Parse this job description and return in JSON format containing the following keys: 
-            `role`, `company`, `experience`, `skills`, `description`, `location` (if mentioned).
+            Parse this job description and return one JSON object matching this JSON schema:
+            {schema}
+            Include `location` only if it is mentioned.
             Extract the key requirements and responsibilities.
             Only return the valid JSON.
             ### VALID JSON (NO PREAMBLE):
-        """)
-        chain_parse = prompt_parse | self.llm
-        res = chain_parse.invoke(input={"job_text": job_text})
+        """
+
+# (template, fixed variables) per Chain method; schemas are rendered into the
+# template once instead of on every call
+PROMPT_SPECS = {
+    "extract_jobs": (EXTRACT_JOBS_TEMPLATE, {"schema": schema_prompt(JOB_SCHEMA)}),
+    "resume": (RESUME_TEMPLATE, {"schema": schema_prompt(RESUME_SCHEMA)}),
+    "email": (EMAIL_TEMPLATE, {}),
+    "parse_job": (PARSE_JOB_TEMPLATE, {"schema": schema_prompt(JOB_SCHEMA)})
+}
+
+# Bump for changes that alter results without touching a template, the model
+# or its temperature (parsing, for instance)
+PROMPT_REVISION = "4"
+
+MODEL_NAME = "llama-3.3-70b-versatile"
+DEFAULT_TEMPERATURE = 0.2
+
+
+def _prompt_hash(*parts):
+    digest = hashlib.sha256(PROMPT_REVISION.encode("utf-8"))
+    for part in parts:
+        digest.update(b"\x1f")
+        digest.update(part.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# Compiled once per process and shared by every Chain
+PROMPTS = {
+    name: PromptTemplate.from_template(template).partial(**fixed) if fixed else PromptTemplate.from_template(template)
+    for name, (template, fixed) in PROMPT_SPECS.items()
+}
+
+# Per-prompt content hashes, used as cache keys so editing one prompt only
+# invalidates the results that came from it; switching the model or its
+# temperature invalidates them all
+PROMPT_VERSIONS = {
+    name: _prompt_hash(MODEL_NAME, str(DEFAULT_TEMPERATURE), template, *(fixed[key] for key in sorted(fixed)))
+    for name, (template, fixed) in PROMPT_SPECS.items()
+}
+PROMPT_VERSION = _prompt_hash(*(PROMPT_VERSIONS[name] for name in sorted(PROMPT_VERSIONS)))
+
+# Groq's JSON mode guarantees a syntactically valid object; the schema in the
+# prompt constrains its shape and the models validate it
+JSON_MODE = {"response_format": {"type": "json_object"}}
+
+# Variants are sampled hotter than the default so they actually differ
+VARIANT_TEMPERATURE = 0.8
+
+class Chain:
+    def __init__(self, llm=None, ledger=None, flight=None, admission=None):
+        self._llm = None
+        self._runnables = None
+        self.ledger = ledger or get_ledger()
+        self.flight = flight or get_single_flight()
+        self.admission = admission or get_admission()
+        if llm is not None:
+            self._compile(llm)
+
+    def _compile(self, llm):
+        # Prompt | model pipelines are built once per Chain and reused by every call
+        self._llm = llm
+        json_llm = llm.bind(**JSON_MODE)
+        self._runnables = {
+            "extract_jobs": PROMPTS["extract_jobs"] | llm,
+            "resume": PROMPTS["resume"] | json_llm,
+            "email": PROMPTS["email"] | llm,
+            "email_variants": PROMPTS["email"] | llm.bind(temperature=VARIANT_TEMPERATURE),
+            "parse_job": PROMPTS["parse_job"] | json_llm
+        }
+
+    @property
+    def llm(self):
+        # langchain_groq is slow to import; defer it until the first LLM call
+        if self._llm is None:
+            from replay import wrap_llm
+
+            def make_llm():
+                from langchain_groq import ChatGroq
+                return ChatGroq(
+                    temperature=DEFAULT_TEMPERATURE,
+                    groq_api_key=os.getenv("GROQ_API_KEY"),
+                    model_name=MODEL_NAME
+                )
+
+            # With REPLAY_MODE set, calls go through the record/replay cassette
+            self._compile(wrap_llm(make_llm, MODEL_NAME))
+        return self._llm
+
+    def _runnable(self, name):
+        if self._runnables is None:
+            self.llm  # resolves the default model, which compiles the runnables
+        return self._runnables[name]
+
+    def _model_name(self):
+        llm = self.llm
+        return getattr(llm, "model_name", None) or llm._llm_type
+
+    def _admit(self, method):
+        # Per-session refusals (cache-only shedding, an exhausted budget) are
+        # decided for each caller before it joins a coalesced call, so one
+        # session's refusal is never handed to another session waiting on it
+        self.admission.check(method)
+        self.ledger.admit(method)
+
+    @contextmanager
+    def _track(self, method, prompt, inputs, copies=1, admitted=False):
+        # Usage, cost and latency of one call go to the ledger, billed to the
+        # session / batch in the current usage_scope; the admission controller
+        # counts it as in flight, or refuses it when only cached results are served.
+        # `admitted` means the caller already ran _admit().
+        prompt_chars = len(PROMPT_SPECS[prompt][0]) + sum(len(str(value)) for value in inputs.values())
+        with self.admission.call(method, check=not admitted), \
+                self.ledger.track(method, self._model_name(), prompt_chars * copies, admit=not admitted) as usage:
+            yield usage
+
+    def _flight_key(self, method, prompt, inputs):
+        # Identical concurrent calls (same prompt version, model and
+        # whitespace-normalized inputs) share one LLM call; only that call is
+        # billed, to the caller that made it
+        return flight_key(method, PROMPT_VERSIONS[prompt], self._model_name(), *inputs.values())
+
+    def extract_jobs(self, cleaned_text):
+        return list(self.stream_jobs(cleaned_text))
+
+    def stream_jobs(self, cleaned_text):
+        inputs = {"page_data": cleaned_text}
+        self._admit("extract_jobs")
+        key = self._flight_key("extract_jobs", "extract_jobs", inputs)
+        return self.flight.stream(key, lambda: self._stream_jobs(inputs))
+
+    def _stream_jobs(self, inputs):
+        # Yields each job as soon as its JSON object closes in the streamed response
+        parser = IncrementalJSONParser()
+        received = []
+        emitted = 0
+        # Latency here spans the open stream; single-flight drains it on its own thread
+        with self._track("extract_jobs", "extract_jobs", inputs, admitted=True) as usage:
+            for chunk in self._runnable("extract_jobs").stream(input=inputs):
+                usage.add(chunk)
+                received.append(chunk.content)
+                for job in parser.feed(chunk.content):
+                    try:
+                        job = Job.from_dict(job)
+                    except ValidationError:
+                        continue
+                    emitted += 1
+                    yield job
+        if emitted == 0:
+            # Nothing closed cleanly while streaming; fall back to repairing the whole answer
+            try:
+                res = parse_llm_json("".join(received))
+            except ValueError:
+                raise OutputParserException("Context too big. Unable to parse jobs.")
+            for job in res if isinstance(res, list) else [res]:
+                try:
+                    yield Job.from_dict(job)
+                except ValidationError:
+                    continue
+
+    def extract_resume_info(self, resume_text):
+        inputs = {"resume_text": resume_text}
+        self._admit("extract_resume_info")
+        return self.flight.do(self._flight_key("extract_resume_info", "resume", inputs),
+                              lambda: self._extract_resume_info(inputs))
+
+    def _extract_resume_info(self, inputs):
+        with self._track("extract_resume_info", "resume", inputs, admitted=True) as usage:
+            res = self._runnable("resume").invoke(input=inputs)
+            usage.add(res)
         try:
-            json_parser = JsonOutputParser()
-            res = json_parser.parse(res.content)
-        except OutputParserException:
+            return ResumeInfo.from_dict(parse_llm_json(res.content))
+        except ValueError:
+            raise OutputParserException("Unable to parse resume information.")
+
+    @staticmethod
+    def _email_inputs(job, resume_info, relevant_projects):
+        return {
+            "job_description": Job.from_dict(job).to_prompt(),
+            "resume_info": ResumeInfo.from_dict(resume_info).to_prompt(),
+            "relevant_projects": "\n".join(Project.from_dict(project).to_prompt() for project in relevant_projects) or "None"
+        }
+
+    def write_candidate_email(self, job, resume_info, relevant_projects):
+        inputs = self._email_inputs(job, resume_info, relevant_projects)
+        self._admit("write_candidate_email")
+        return self.flight.do(self._flight_key("write_candidate_email", "email", inputs),
+                              lambda: self._write_candidate_email(inputs))
+
+    def _write_candidate_email(self, inputs):
+        with self._track("write_candidate_email", "email", inputs, admitted=True) as usage:
+            res = self._runnable("email").invoke(inputs)
+            usage.add(res)
+        return res.content
+
+    def write_email_variants(self, job, resume_info, relevant_projects, n=3):
+        # One batched call: the n samples run concurrently, so n variants cost
+        # about the latency of a single email
+        inputs = self._email_inputs(job, resume_info, relevant_projects)
+        with self._track("write_email_variants", "email", inputs, copies=n) as usage:
+            results = self._runnable("email_variants").batch([inputs] * n, config={"max_concurrency": n})
+            for res in results:
+                usage.add(res)
+        return [res.content for res in results]
+
+    def parse_job_description(self, job_text):
+        inputs = {"job_text": job_text}
+        self._admit("parse_job_description")
+        return self.flight.do(self._flight_key("parse_job_description", "parse_job", inputs),
+                              lambda: self._parse_job_description(inputs))
+
+    def _parse_job_description(self, inputs):
+        with self._track("parse_job_description", "parse_job", inputs, admitted=True) as usage:
+            res = self._runnable("parse_job").invoke(input=inputs)
+            usage.add(res)
+        try:
+            return Job.from_dict(parse_llm_json(res.content))
+        except ValueError:
             raise OutputParserException("Unable to parse job description.")
-        return res
+
+
+def measure_rendering(iterations=2000):
+    # Per-call cost of building the prompt the old way (parse the template and
+    # render the schema on every call) against formatting the precompiled prompt
+    sample = {
+        "extract_jobs": {"page_data": "Senior Python Engineer. 5+ years. Django, PostgreSQL. " * 40},
+        "resume": {"resume_text": "Jane Doe. Python developer with 4 years of experience. " * 40},
+        "email": {"job_description": "{}", "resume_info": "{}", "relevant_projects": "None"},
+        "parse_job": {"job_text": "Backend Engineer at Acme. 3+ years of Go and Kubernetes. " * 40}
+    }
+    schemas = {"extract_jobs": JOB_SCHEMA, "resume": RESUME_SCHEMA, "parse_job": JOB_SCHEMA}
+    report = {}
+    for name, inputs in sample.items():
+        template = PROMPT_SPECS[name][0]
+        started = time.perf_counter()
+        for _ in range(iterations):
+            extra = {"schema": schema_prompt(schemas[name])} if name in schemas else {}
+            PromptTemplate.from_template(template).format(**inputs, **extra)
+        per_call = (time.perf_counter() - started) / iterations
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            PROMPTS[name].format(**inputs)
+        precompiled = (time.perf_counter() - started) / iterations
+        report[name] = {"per_call_us": round(per_call * 1e6, 1), "precompiled_us": round(precompiled * 1e6, 1)}
+    return report
+
 
 if __name__ == "__main__":
-    print(os.getenv("GROQ_API_KEY"))
+    print(f"prompt version {PROMPT_VERSION}")
+    for name, version in PROMPT_VERSIONS.items():
+        print(f"  {name:<13} {version}")
+    for name, timing in measure_rendering().items():
+        print(f"{name:<13} per call {timing['per_call_us']:>8}us  precompiled {timing['precompiled_us']:>8}us")
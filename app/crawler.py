@@ -0,0 +1,302 @@
+import contextvars
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urldefrag, urljoin, urlparse, urlunparse
+from urllib.robotparser import RobotFileParser
+
+from admission import Overloaded
+from ledger import BudgetExceeded
+from utils import clean_text
+
+
+USER_AGENT = "ColdEmailGenerator-Crawler/1.0 (+https://github.com/ABHINAV2087/ColdConnectai_Cold-Email)"
+
+# Links worth following from a careers page: postings and listing pages
+POSTING_LINK = re.compile(r"job|career|position|opening|vacanc|role|posting|requisition|apply", re.IGNORECASE)
+PAGINATION_LINK = re.compile(r"[?&](?:page|p|offset|start)=\d+|/page/\d+", re.IGNORECASE)
+PAGINATION_TEXT = re.compile(r"^\s*(?:next|more|older|›|»|>|\d+)\s*$", re.IGNORECASE)
+_LOC = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+
+
+def normalize_url(url):
+    url, _ = urldefrag(url.strip())
+    parts = urlparse(url)
+    path = parts.path or "/"
+    if path != "/" and path.endswith("/"):
+        path = path[:-1]
+    return urlunparse((parts.scheme.lower(), parts.netloc.lower(), path, "", parts.query, ""))
+
+
+class CrawledPage:
+    __slots__ = ("url", "depth", "text", "content_hash")
+
+    def __init__(self, url, depth, text):
+        self.url = url
+        self.depth = depth
+        self.text = text
+        self.content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class HostThrottle:
+    # At most `limit` requests in flight per host, started at least `delay` apart
+    def __init__(self, limit, delay):
+        self._semaphore = threading.Semaphore(limit)
+        self._lock = threading.Lock()
+        self._delay = delay
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self._delay
+        if start > now:
+            time.sleep(start - now)
+
+    def __exit__(self, *exc):
+        self._semaphore.release()
+
+
+# Bounded, polite crawl of a careers site: seeds come from the start URL and the
+# site's sitemaps, pages are fetched concurrently under per-host limits and
+# robots.txt, and pagination/posting links are followed up to `max_depth`.
+# Pages are yielded as they arrive, deduplicated by URL and by content hash.
+class Crawler:
+    def __init__(self, max_pages=20, max_depth=2, workers=8, per_host=2, delay=0.25, timeout=10.0,
+                 max_page_bytes=2 * 1024 * 1024, max_sitemap_urls=200, user_agent=USER_AGENT, client=None):
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.workers = workers
+        self.per_host = per_host
+        self.delay = delay
+        self.timeout = timeout
+        self.max_page_bytes = max_page_bytes
+        self.max_sitemap_urls = max_sitemap_urls
+        self.user_agent = user_agent
+        self._client = client
+        self._throttles = {}
+        self._robots = {}
+        self._lock = threading.Lock()
+        self.stats = {"fetched": 0, "failed": 0, "duplicate_content": 0, "disallowed": 0, "sitemap_urls": 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            from replay import http_transport
+            self._client = httpx.Client(
+                timeout=self.timeout, follow_redirects=True, headers={"User-Agent": self.user_agent},
+                transport=http_transport()
+            )
+        return self._client
+
+    def _throttle(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            throttle = self._throttles.get(host)
+            if throttle is None:
+                throttle = self._throttles[host] = HostThrottle(self.per_host, self.delay)
+            return throttle
+
+    def _get(self, url):
+        with self._throttle(url):
+            with self.client.stream("GET", url) as response:
+                if response.status_code != 200:
+                    return None, None
+                body = bytearray()
+                for chunk in response.iter_bytes():
+                    body.extend(chunk)
+                    if len(body) > self.max_page_bytes:
+                        break
+                return response.headers.get("content-type", ""), bytes(body[:self.max_page_bytes])
+
+    def _robots_for(self, url):
+        parts = urlparse(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            robots = self._robots.get(origin)
+        if robots is not None:
+            return robots
+        robots = RobotFileParser()
+        try:
+            _, body = self._get(f"{origin}/robots.txt")
+            robots.parse(body.decode("utf-8", errors="replace").splitlines() if body else [])
+        except Exception:
+            robots.parse([])
+        with self._lock:
+            self._robots[origin] = robots
+        return robots
+
+    def allowed(self, url):
+        return self._robots_for(url).can_fetch(self.user_agent, url)
+
+    def sitemap_urls(self, start_url):
+        # Posting URLs listed in the site's sitemaps (robots.txt entries or /sitemap.xml)
+        parts = urlparse(start_url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        robots = self._robots_for(start_url)
+        pending = list(robots.site_maps() or []) or [f"{origin}/sitemap.xml"]
+        seen, urls = set(), []
+        while pending and len(seen) < 10 and len(urls) < self.max_sitemap_urls:
+            sitemap = pending.pop(0)
+            if sitemap in seen:
+                continue
+            seen.add(sitemap)
+            try:
+                _, body = self._get(sitemap)
+            except Exception:
+                continue
+            if not body:
+                continue
+            text = body.decode("utf-8", errors="replace")
+            for loc in _LOC.findall(text):
+                if "<sitemapindex" in text:
+                    pending.append(loc)
+                elif self._in_scope(start_url, loc) and POSTING_LINK.search(urlparse(loc).path):
+                    urls.append(loc)
+        self.stats["sitemap_urls"] = len(urls)
+        return urls[:self.max_sitemap_urls]
+
+    @staticmethod
+    def _in_scope(start_url, url):
+        return urlparse(url).netloc.lower() == urlparse(start_url).netloc.lower()
+
+    def _parse(self, url, html):
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, "lxml")
+        links = []
+        for anchor in soup.find_all("a", href=True):
+            target = urljoin(url, anchor["href"])
+            if not target.startswith(("http://", "https://")):
+                continue
+            rel = " ".join(anchor.get("rel") or [])
+            if "next" in rel or PAGINATION_LINK.search(target) or PAGINATION_TEXT.match(anchor.get_text()):
+                links.append(target)
+            elif POSTING_LINK.search(urlparse(target).path):
+                links.append(target)
+        for tag in soup(["script", "style", "noscript"]):
+            tag.decompose()
+        return clean_text(soup.get_text(" ")), links
+
+    def _fetch(self, url, depth):
+        if not self.allowed(url):
+            with self._lock:
+                self.stats["disallowed"] += 1
+            return None, []
+        content_type, body = self._get(url)
+        if body is None or ("html" not in content_type and "text" not in content_type):
+            return None, []
+        text, links = self._parse(url, body.decode("utf-8", errors="replace"))
+        return CrawledPage(url, depth, text), links
+
+    def crawl(self, start_url, use_sitemaps=True):
+        start_url = normalize_url(start_url)
+        seen_urls = {start_url}
+        seen_content = set()
+        frontier = [(start_url, 0)]
+        if use_sitemaps:
+            for url in self.sitemap_urls(start_url):
+                url = normalize_url(url)
+                if url not in seen_urls:
+                    seen_urls.add(url)
+                    frontier.append((url, 1))
+
+        scheduled = 0
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawler") as executor:
+            try:
+                while frontier or running:
+                    while frontier and scheduled < self.max_pages:
+                        url, depth = frontier.pop(0)
+                        running[executor.submit(self._fetch, url, depth)] = (url, depth)
+                        scheduled += 1
+                    frontier = frontier if scheduled < self.max_pages else []
+                    if not running:
+                        break
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url, depth = running.pop(future)
+                        try:
+                            page, links = future.result()
+                        except Exception:
+                            self.stats["failed"] += 1
+                            continue
+                        if page is None:
+                            continue
+                        self.stats["fetched"] += 1
+
+                        if depth < self.max_depth:
+                            for link in links:
+                                link = normalize_url(link)
+                                if link not in seen_urls and self._in_scope(start_url, link):
+                                    seen_urls.add(link)
+                                    frontier.append((link, depth + 1))
+
+                        if page.content_hash in seen_content or not page.text:
+                            self.stats["duplicate_content"] += 1
+                            continue
+                        seen_content.add(page.content_hash)
+                        yield page
+            finally:
+                # Closing the generator early drops the fetches that have not started
+                for future in running:
+                    future.cancel()
+
+
+class CrawlFailed(RuntimeError):
+    pass
+
+
+def crawl_jobs(chain, start_url, crawler=None, workers=None, report=None):
+    # Streams jobs while the crawl is still running: each new page goes to
+    # Chain.extract_jobs on a small pool and jobs are yielded as pages finish.
+    # `report`, if given, is filled with the pages extracted and how many of
+    # them failed, so callers can tell a partial crawl from a complete one.
+    crawler = crawler or Crawler(
+        max_pages=int(os.getenv("CRAWL_MAX_PAGES", "20")),
+        max_depth=int(os.getenv("CRAWL_MAX_DEPTH", "2"))
+    )
+    workers = workers or int(os.getenv("CRAWL_EXTRACT_WORKERS", "4"))
+    report = {} if report is None else report
+    report.update(pages=0, failed=0, error=None)
+    pages = crawler.crawl(start_url)
+    extracting = set()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawl-extract") as executor:
+        try:
+            for page in pages:
+                # Extractions are billed to the caller's usage scope
+                extracting.add(executor.submit(contextvars.copy_context().run, chain.extract_jobs, page.text))
+                finished = {future for future in extracting if future.done()}
+                for future in finished:
+                    extracting.discard(future)
+                    yield from _page_jobs(future, report)
+            for future in as_completed(list(extracting)):
+                extracting.discard(future)
+                yield from _page_jobs(future, report)
+        finally:
+            pages.close()
+            for future in extracting:
+                future.cancel()
+    if report["pages"] and report["failed"] == report["pages"]:
+        raise CrawlFailed(f"Job extraction failed on all {report['pages']} crawled pages: {report['error']}")
+
+
+def _page_jobs(future, report):
+    report["pages"] += 1
+    try:
+        return future.result()
+    except (Overloaded, BudgetExceeded):
+        # Refusals apply to the whole request, not to one page
+        raise
+    except Exception as e:
+        # A page the LLM could not turn into jobs (e.g. an about page) is
+        # skipped; the crawl only fails if no page could be extracted
+        report["failed"] += 1
+        report["error"] = e
+        return []
@@ -0,0 +1,99 @@
+import hashlib
+import re
+
+
+HASH_BITS = 64
+BANDS = 4
+DEFAULT_MAX_DISTANCE = 3
+
+_WORD = re.compile(r"[a-z0-9+#.]+")
+
+
+def _field_text(value):
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return " ".join(str(item) for item in value.values())
+    return str(value or "")
+
+
+def job_fingerprint_text(job):
+    # Location is deliberately excluded (and scrubbed from the other fields) so
+    # the same role posted for several cities hashes to the same fingerprint
+    parts = [_field_text(job.get(key)) for key in ("role", "company", "experience", "skills", "description")]
+    text = " ".join(parts).lower()
+    location = _field_text(job.get("location")).lower()
+    for token in _WORD.findall(location):
+        if len(token) > 2:
+            text = re.sub(rf"\b{re.escape(token)}\b", " ", text)
+    return text
+
+
+def simhash(text, shingle_size=3):
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * HASH_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(HASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def find_duplicate_groups(jobs, max_distance=DEFAULT_MAX_DISTANCE):
+    # Returns [(representative_index, [duplicate_indices])] in posting order.
+    # Fingerprints are bucketed by 16-bit bands so only jobs sharing a band are
+    # compared; with max_distance < BANDS two near-duplicates always share one.
+    fingerprints = [simhash(job_fingerprint_text(job)) for job in jobs]
+    band_bits = HASH_BITS // BANDS
+    band_mask = (1 << band_bits) - 1
+    buckets = {}
+    parent = list(range(len(jobs)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for index, fingerprint in enumerate(fingerprints):
+        candidates = set()
+        for band in range(BANDS):
+            key = (band, fingerprint >> (band * band_bits) & band_mask)
+            candidates.update(buckets.setdefault(key, []))
+            buckets[key].append(index)
+        for other in candidates:
+            if hamming_distance(fingerprint, fingerprints[other]) <= max_distance:
+                root, other_root = find(index), find(other)
+                if root != other_root:
+                    parent[max(root, other_root)] = min(root, other_root)
+
+    groups = {}
+    for index in range(len(jobs)):
+        groups.setdefault(find(index), []).append(index)
+    return [(members[0], members[1:]) for members in sorted(groups.values())]
+
+
+def tailor_email(email, source_job, target_job):
+    # Fan a representative's email out to a duplicate posting by swapping the
+    # location- and role-specific strings that differ between the two
+    tailored = email
+    for key in ("location", "role"):
+        source = _field_text(source_job.get(key)).strip()
+        target = _field_text(target_job.get(key)).strip()
+        if source and target and source != target:
+            tailored = tailored.replace(source, target)
+    return tailored
@@ -0,0 +1,137 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from utils import clean_resume_text
+
+
+PDF_TYPE = "application/pdf"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+TXT_TYPE = "text/plain"
+
+MAX_DOCUMENT_BYTES = int(os.getenv("MAX_DOCUMENT_MB", "10")) * 1024 * 1024
+MAX_TEXT_CHARS = int(os.getenv("MAX_DOCUMENT_CHARS", "200000"))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "50"))
+# Bump when extraction or cleaning changes its output. Cached resume text is
+# keyed on this and the limits, not on the LLM prompts it is later fed to.
+EXTRACTION_REVISION = "1"
+DOCUMENT_VERSION = f"{EXTRACTION_REVISION}:{MAX_TEXT_CHARS}:{MAX_PDF_PAGES}"
+# Below this many tables the pool hand-off costs more than it saves
+PARALLEL_TABLES = 4
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+class DocumentTooLarge(ValueError):
+    pass
+
+
+def read_bounded(source, max_bytes=MAX_DOCUMENT_BYTES):
+    # Accepts bytes or a file-like object; never reads more than max_bytes + 1
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+    else:
+        data = source.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise DocumentTooLarge(f"Document is larger than {max_bytes // (1024 * 1024)}MB")
+    return data
+
+
+def _bounded_join(parts, separator, max_chars):
+    # Collect pieces until the cap is reached, then join once
+    kept = []
+    total = 0
+    for part in parts:
+        if not part:
+            continue
+        kept.append(part)
+        total += len(part) + len(separator)
+        if total >= max_chars:
+            break
+    return separator.join(kept)[:max_chars]
+
+
+def extract_pdf_text(data, max_chars=MAX_TEXT_CHARS, max_pages=MAX_PDF_PAGES):
+    import PyPDF2
+    reader = PyPDF2.PdfReader(BytesIO(data))
+    pages = (reader.pages[index].extract_text() for index in range(min(len(reader.pages), max_pages)))
+    return _bounded_join(pages, "\n", max_chars)
+
+
+_BREAKS = {f"{_W}tab": "\t", f"{_W}br": "\n", f"{_W}cr": "\n"}
+
+
+def _paragraph_text(element):
+    return "".join(
+        node.text or "" if node.tag == f"{_W}t" else _BREAKS[node.tag]
+        for node in element.iter(f"{_W}t", *_BREAKS)
+    )
+
+
+def _table_text(element):
+    rows = []
+    for row in element.iter(f"{_W}tr"):
+        cells = []
+        for cell in row.iter(f"{_W}tc"):
+            text = " ".join(filter(None, (_paragraph_text(p) for p in cell.iter(f"{_W}p")))).strip()
+            # Merged cells repeat their text; keep each value once per row
+            if text and text not in cells:
+                cells.append(text)
+        if cells:
+            rows.append(" | ".join(cells))
+    return "\n".join(rows)
+
+
+def extract_docx_text(data, max_chars=MAX_TEXT_CHARS):
+    # Walks the body XML directly so paragraphs and tables keep document order;
+    # tables are flattened on the shared worker pool when there are several
+    import docx
+    body = docx.Document(BytesIO(data)).element.body
+    blocks = [child for child in body if child.tag in (f"{_W}p", f"{_W}tbl")]
+    tables = [block for block in blocks if block.tag == f"{_W}tbl"]
+    if len(tables) >= PARALLEL_TABLES:
+        table_texts = dict(zip(map(id, tables), _table_pool().map(_table_text, tables)))
+    else:
+        table_texts = {id(table): _table_text(table) for table in tables}
+    parts = (table_texts[id(block)] if block.tag == f"{_W}tbl" else _paragraph_text(block) for block in blocks)
+    return _bounded_join(parts, "\n", max_chars)
+
+
+def extract_txt_text(data, max_chars=MAX_TEXT_CHARS):
+    return data[:max_chars * 4].decode("utf-8-sig", errors="replace")[:max_chars]
+
+
+def detect_type(file_type=None, file_name=None):
+    if file_type in (PDF_TYPE, DOCX_TYPE):
+        return file_type
+    extension = (file_name or "").rsplit(".", 1)[-1].lower()
+    return {"pdf": PDF_TYPE, "docx": DOCX_TYPE}.get(extension, TXT_TYPE)
+
+
+def extract_document(source, file_type=None, file_name=None, max_bytes=MAX_DOCUMENT_BYTES, max_chars=MAX_TEXT_CHARS):
+    # One entry point for PDF, DOCX and TXT resumes: bounded read, one join, cleaned text
+    data = read_bounded(source, max_bytes)
+    file_type = detect_type(file_type, file_name)
+    if file_type == PDF_TYPE:
+        text = extract_pdf_text(data, max_chars)
+    elif file_type == DOCX_TYPE:
+        text = extract_docx_text(data, max_chars)
+    else:
+        text = extract_txt_text(data, max_chars)
+    return clean_resume_text(text)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _table_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=int(os.getenv("DOCUMENT_WORKERS", "4")),
+                thread_name_prefix="document"
+            )
+        return _pool
@@ -0,0 +1,54 @@
+import re
+
+from models import Job, Project
+
+
+MIN_WORDS = 200
+MAX_WORDS = 300
+WEIGHTS = {"length": 0.4, "skills": 0.4, "links": 0.2}
+
+_WORD = re.compile(r"\b[\w'’-]+\b")
+_URL = re.compile(r"https?://\S+")
+
+
+def length_score(word_count):
+    # 1.0 inside the 200-300 word band the prompt asks for, fading out over 200 words
+    if MIN_WORDS <= word_count <= MAX_WORDS:
+        return 1.0
+    distance = MIN_WORDS - word_count if word_count < MIN_WORDS else word_count - MAX_WORDS
+    return max(0.0, 1.0 - distance / MIN_WORDS)
+
+
+def skill_coverage(email_lower, skills):
+    if not skills:
+        return 1.0
+    return sum(skill.lower() in email_lower for skill in skills) / len(skills)
+
+
+def link_coverage(email, projects):
+    project_links = [[link for link in (project.links, project.github, project.demo) if link] for project in projects]
+    project_links = [links for links in project_links if links]
+    if not project_links:
+        return 1.0
+    mentioned = {url.rstrip(".,;:)") for url in _URL.findall(email)}
+    # A project counts once any of its links appears in the email
+    return sum(any(link in mentioned for link in links) for links in project_links) / len(project_links)
+
+
+def score_email(email, job, projects):
+    job = Job.from_dict(job)
+    projects = [Project.from_dict(project) for project in projects]
+    words = len(_WORD.findall(email))
+    parts = {
+        "length": length_score(words),
+        "skills": skill_coverage(email.lower(), job.skills),
+        "links": link_coverage(email, projects)
+    }
+    score = sum(WEIGHTS[name] * value for name, value in parts.items())
+    return {"score": round(score, 4), "words": words, **{name: round(value, 4) for name, value in parts.items()}}
+
+
+def rank_emails(emails, job, projects):
+    # Best first; ties keep generation order
+    scored = [{"email": email, **score_email(email, job, projects)} for email in emails]
+    return sorted(scored, key=lambda variant: -variant["score"])
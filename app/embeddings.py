@@ -0,0 +1,284 @@
+import hashlib
+import os
+import queue
+import tarfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# The same ONNX export and cache directory Chroma's default embedding function
+# uses, so a model Chroma already downloaded is reused and vectors match
+MODEL_URL = "https://chroma-onnx-models.s3.amazonaws.com/all-MiniLM-L6-v2/onnx.tar.gz"
+MODEL_SHA256 = "913d7300ceae3b2dbc2c50d1de4baacab4be7b9380491c27fab7418616a16ec3"
+MODEL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "chroma", "onnx_models", DEFAULT_MODEL_NAME)
+MODEL_FILES = ["config.json", "model.onnx", "special_tokens_map.json", "tokenizer_config.json", "tokenizer.json",
+               "vocab.txt"]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# all-MiniLM-L6-v2 on onnxruntime without going through chromadb: mean-pooled,
+# L2-normalized sentence embeddings, downloaded on first use
+class MiniLM:
+    def __init__(self, model_dir=None, max_length=256, batch_size=32):
+        self.model_dir = model_dir or MODEL_DIR
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self._load()
+
+    def _download(self):
+        import httpx
+        os.makedirs(self.model_dir, exist_ok=True)
+        archive = os.path.join(self.model_dir, "onnx.tar.gz")
+        if not os.path.exists(archive) or _sha256(archive) != MODEL_SHA256:
+            with httpx.stream("GET", MODEL_URL, follow_redirects=True, timeout=60) as response:
+                response.raise_for_status()
+                with open(archive, "wb") as f:
+                    for chunk in response.iter_bytes():
+                        f.write(chunk)
+            if _sha256(archive) != MODEL_SHA256:
+                os.remove(archive)
+                raise ValueError(f"Downloaded {MODEL_URL} does not match its expected SHA256")
+        # Only the known files are extracted, so the archive cannot write elsewhere
+        with tarfile.open(archive, "r:gz") as tar:
+            for name in MODEL_FILES:
+                tar.extract(f"onnx/{name}", self.model_dir)
+
+    def _load(self):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        files = os.path.join(self.model_dir, "onnx")
+        if not all(os.path.exists(os.path.join(files, name)) for name in MODEL_FILES):
+            self._download()
+        self.tokenizer = Tokenizer.from_file(os.path.join(files, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]", length=self.max_length)
+        options = onnxruntime.SessionOptions()
+        options.log_severity_level = 3
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(os.path.join(files, "model.onnx"), options,
+                                                    providers=onnxruntime.get_available_providers())
+
+    def _forward(self, texts):
+        encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        hidden = self.session.run(None, {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.zeros_like(input_ids)
+        })[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        norms[norms == 0] = 1e-12
+        return (pooled / norms).astype(np.float32)
+
+    def __call__(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._forward(list(texts[start:start + self.batch_size])))
+        return vectors
+
+
+def default_model_factory():
+    return MiniLM()
+
+
+class EmbeddingCache:
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        with self._lock:
+            vector = self._entries.get(text)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return vector
+
+    def put(self, text, vector):
+        with self._lock:
+            self._entries[text] = vector
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Process-wide embedding service: every session queues its texts here, a
+# dispatcher thread groups them into micro-batches on a short deadline and a
+# CPU thread pool runs the single shared model over each batch. It follows
+# Chroma's embedding function interface without importing chromadb; the Chroma
+# backend wraps it when it opens a collection.
+class EmbeddingService:
+    def __init__(self, model_factory=None, max_batch_size=64, max_wait_ms=10, workers=2, cache_size=10000, model_name=None):
+        self.model_factory = model_factory or default_model_factory
+        # Identifies the vectors this service produces, so precomputed ones are only reused when they match
+        self.model_name = model_name or (DEFAULT_MODEL_NAME if model_factory is None else None)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.cache = EmbeddingCache(cache_size)
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding")
+        self._dispatcher = None
+        self._dispatcher_lock = threading.Lock()
+        # text -> Future for texts queued or being embedded, so a text that is
+        # already on its way is not queued again by another caller
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.batches = 0
+        self.embedded_texts = 0
+        self.coalesced = 0
+
+    # Chroma records this name in the collection config; "default" is its own
+    # DefaultEmbeddingFunction, which would be rebuilt in place of this service
+    @staticmethod
+    def name():
+        return "cold_email_embedding_service"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return get_embedding_service()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self.model_factory()
+        return self._model
+
+    def warm_up(self):
+        self.embed(["warm up"])
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is not None:
+            return
+        with self._dispatcher_lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="embedding-dispatcher", daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._run_batch, batch)
+
+    def _settle(self, text, futures):
+        with self._inflight_lock:
+            if self._inflight.get(text) in futures:
+                del self._inflight[text]
+
+    def _run_batch(self, batch):
+        # Identical texts queued by different sessions are embedded once
+        pending = OrderedDict()
+        for text, future in batch:
+            pending.setdefault(text, []).append(future)
+        texts = list(pending)
+        try:
+            vectors = self.model(texts)
+        except Exception as e:
+            for text, futures in pending.items():
+                self._settle(text, futures)
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.embedded_texts += len(texts)
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            # Cached before leaving the in-flight map, so no caller misses both
+            self.cache.put(text, vector)
+            self._settle(text, pending[text])
+            for future in pending[text]:
+                future.set_result(vector)
+
+    def embed(self, texts):
+        results = [None] * len(texts)
+        queued = False
+        for position, text in enumerate(texts):
+            vector = self.cache.get(text)
+            if vector is not None:
+                results[position] = vector
+                continue
+            with self._inflight_lock:
+                future = self._inflight.get(text)
+                if future is None:
+                    future = self._inflight[text] = Future()
+                    self._queue.put((text, future))
+                    queued = True
+                else:
+                    self.coalesced += 1
+            results[position] = future
+
+        if queued:
+            self._ensure_dispatcher()
+        return [item.result() if isinstance(item, Future) else item for item in results]
+
+    def __call__(self, input):
+        return self.embed(list(input))
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "embedded_texts": self.embedded_texts,
+            "cache_size": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "coalesced": self.coalesced,
+            "queued": self._queue.qsize()
+        }
+
+
+_embedding_service = None
+_embedding_service_lock = threading.Lock()
+
+
+def get_embedding_service():
+    global _embedding_service
+    with _embedding_service_lock:
+        if _embedding_service is None:
+            _embedding_service = EmbeddingService(
+                max_batch_size=int(os.getenv("EMBEDDING_MAX_BATCH", "64")),
+                max_wait_ms=float(os.getenv("EMBEDDING_MAX_WAIT_MS", "10")),
+                workers=int(os.getenv("EMBEDDING_WORKERS", "2")),
+                cache_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+            )
+        return _embedding_service
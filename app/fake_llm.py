@@ -0,0 +1,74 @@
+import json
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+FAKE_RESUME = {
+    "name": "Jordan Lee",
+    "email": "jordan.lee@example.com",
+    "phone": "555-123-4567",
+    "skills": ["Python", "React", "PostgreSQL", "Docker"],
+    "experience": [{"company": "Acme", "role": "Software Engineer", "duration": "2 years", "achievements": "Built APIs"}],
+    "projects": [{"name": "Task Manager", "description": "Realtime collaborative todo app"}],
+    "education": "B.Tech in Computer Science",
+    "summary": "Full-stack engineer focused on web platforms"
+}
+
+FAKE_JOB = {
+    "role": "Backend Engineer",
+    "company": "Example Corp",
+    "experience": "2+ years",
+    "skills": ["Python", "Django", "PostgreSQL"],
+    "description": "Build and operate backend services",
+    "location": "Remote"
+}
+
+FAKE_EMAIL = """Subject: Application for Backend Engineer
+
+Dear Hiring Manager,
+
+I am Jordan Lee, a Computer Science graduate and software engineer at Acme. I am excited about the Backend Engineer role at Example Corp.
+
+Best regards,
+Jordan Lee
+jordan.lee@example.com | 555-123-4567"""
+
+
+# Deterministic stand-in for ChatGroq: answers each Chain prompt with a canned
+# response and sleeps `latency` seconds to mimic the network round trip.
+class FakeChatModel(BaseChatModel):
+    latency: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "fake-cold-email"
+
+    def _respond(self, prompt):
+        if "### RESUME TEXT" in prompt:
+            return json.dumps(FAKE_RESUME)
+        if "### SCRAPED TEXT FROM WEBSITE" in prompt:
+            return json.dumps([FAKE_JOB, dict(FAKE_JOB, role="Data Engineer")])
+        if "### JOB DESCRIPTION TEXT" in prompt:
+            return json.dumps(FAKE_JOB)
+        return FAKE_EMAIL
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "\n".join(str(message.content) for message in messages)
+        message = AIMessage(content=self._respond(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "\n".join(str(message.content) for message in messages)
+        content = self._respond(prompt)
+        for start in range(0, len(content), 16):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=content[start:start + 16]))
@@ -0,0 +1,90 @@
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def build_fixture_site(postings=25, per_page=10, sitemap_postings=5):
+    # A small careers site: paginated listing, one page per posting, a sitemap,
+    # a robots.txt that hides /private and a mirror URL serving duplicate content
+    pages = {}
+    page_count = (postings + per_page - 1) // per_page
+    for page in range(1, page_count + 1):
+        items = "".join(
+            f'<li><a href="/careers/jobs/{n}">Software Engineer {n}</a></li>'
+            for n in range((page - 1) * per_page + 1, min(page * per_page, postings) + 1)
+        )
+        next_link = f'<a rel="next" href="/careers?page={page + 1}">Next</a>' if page < page_count else ""
+        pages[f"/careers?page={page}"] = f"<html><body><h1>Open roles</h1><ul>{items}</ul>{next_link}" \
+                                         f'<a href="/private/jobs">Admin</a></body></html>'
+
+    for n in range(1, postings + 1):
+        pages[f"/careers/jobs/{n}"] = (
+            f"<html><body><h1>Software Engineer {n}</h1><p>Team {n % 4}. {n % 6 + 1}+ years of experience "
+            f"with Python and PostgreSQL. Build services for product line {n}.</p>"
+            f'<script>track("{n}")</script></body></html>'
+        )
+    pages["/careers/jobs/1/mirror"] = pages["/careers/jobs/1"]
+    pages["/careers?page=1"] += '<a href="/careers/jobs/1/mirror">Mirror</a>'
+    pages["/careers"] = pages["/careers?page=1"]
+    pages["/private/jobs"] = "<html><body>Internal</body></html>"
+
+    sitemap_items = "".join(f"<url><loc>{{base}}/careers/jobs/{n}</loc></url>" for n in range(1, sitemap_postings + 1))
+    pages["/sitemap.xml"] = f'<?xml version="1.0"?><urlset>{sitemap_items}<url><loc>{{base}}/about</loc></url></urlset>'
+    pages["/robots.txt"] = "User-agent: *\nDisallow: /private\nSitemap: {base}/sitemap.xml\n"
+    return pages
+
+
+def serve_fixture_site(pages, port=0, latency=0.0):
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append((self.path, time.monotonic()))
+            if latency:
+                time.sleep(latency)
+            body = pages.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            base = f"http://{self.headers['Host']}"
+            payload = body.replace("{base}", base).encode("utf-8")
+            content_type = "text/plain" if self.path == "/robots.txt" else (
+                "application/xml" if self.path.endswith(".xml") else "text/html; charset=utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.requests = requests
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    from chains import Chain
+    from crawler import Crawler, crawl_jobs
+    from fake_llm import FakeChatModel
+
+    parser = argparse.ArgumentParser(description="Crawl a local fixture careers site with the fake LLM")
+    parser.add_argument("--postings", type=int, default=25)
+    parser.add_argument("--max-pages", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fixture server waits per request")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server, base_url = serve_fixture_site(build_fixture_site(args.postings), latency=args.latency)
+    crawler = Crawler(max_pages=args.max_pages, max_depth=3, delay=0.0, per_host=4)
+    started = time.perf_counter()
+    jobs = list(crawl_jobs(Chain(FakeChatModel(latency=args.llm_latency)), f"{base_url}/careers", crawler))
+    elapsed = time.perf_counter() - started
+    print(f"{len(jobs)} jobs from {crawler.stats['fetched']} pages in {elapsed:.2f}s")
+    print(f"crawler stats: {crawler.stats}")
+    print(f"requests served: {len(server.requests)}")
+    server.shutdown()
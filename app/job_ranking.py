@@ -0,0 +1,121 @@
+import os
+import re
+
+import numpy as np
+
+from models import Job, ResumeInfo
+from utils import extract_years_of_experience
+
+
+WEIGHTS = {"skills": 0.5, "similarity": 0.3, "experience": 0.2}
+TOP_K = int(os.getenv("JOB_TOP_K", "5"))
+MIN_SCORE = float(os.getenv("JOB_MIN_SCORE", "0.3"))
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)\b", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def _skill_key(skill):
+    return _SPACES.sub(" ", skill.lower()).strip()
+
+
+def candidate_years(resume_info):
+    # Sum of the listed role durations, or what the summary claims if that is more
+    listed = sum(
+        float(match) for entry in resume_info.experience
+        for match in _DURATION.findall(str(entry.get("duration", "")))
+    )
+    claimed = extract_years_of_experience(resume_info.summary) or 0
+    return max(listed, claimed)
+
+
+def required_years(job):
+    # The job's `experience` field is usually just "3+ years"; name it so the
+    # shared patterns, which expect the word "experience", pick it up
+    text = f"{job.experience} experience" if job.experience else ""
+    return extract_years_of_experience(f"{text} {job.description}")
+
+
+def skill_overlap(jobs, resumes):
+    # Binary job x skill matrix against a resume x skill matrix: for every
+    # (resume, job) pair, the share of the job's skills the candidate lists
+    vocabulary = {}
+    rows, columns = [], []
+    for row, job in enumerate(jobs):
+        for skill in {_skill_key(skill) for skill in job.skills}:
+            rows.append(row)
+            columns.append(vocabulary.setdefault(skill, len(vocabulary)))
+    matrix = np.zeros((len(jobs), max(len(vocabulary), 1)), dtype=np.float32)
+    matrix[rows, columns] = 1.0
+    candidates = np.zeros((len(resumes), matrix.shape[1]), dtype=np.float32)
+    for row, resume_info in enumerate(resumes):
+        for skill in resume_info.skills:
+            column = vocabulary.get(_skill_key(skill))
+            if column is not None:
+                candidates[row, column] = 1.0
+    counts = matrix.sum(axis=1)
+    return np.divide(candidates @ matrix.T, counts, out=np.zeros((len(resumes), len(jobs)), dtype=np.float32),
+                     where=counts > 0)
+
+
+def experience_fit(jobs, resumes):
+    years = np.array([candidate_years(resume_info) for resume_info in resumes], dtype=np.float32)[:, None]
+    required = np.array([required_years(job) or 0 for job in jobs], dtype=np.float32)[None, :]
+    fit = np.divide(years, required, out=np.ones((len(resumes), len(jobs)), dtype=np.float32), where=required > 0)
+    return np.minimum(1.0, fit)
+
+
+def embedding_similarity(jobs, resumes, embed):
+    texts = [f"{job.role} {' '.join(job.skills)} {job.description}" for job in jobs]
+    texts += [f"{resume_info.summary} {' '.join(resume_info.skills)}" for resume_info in resumes]
+    vectors = np.asarray(embed(texts), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    # Cosine similarity of unit-length MiniLM vectors rarely goes below 0
+    return np.clip(vectors[len(jobs):] @ vectors[:len(jobs)].T, 0.0, 1.0)
+
+
+def score_matrix(jobs, resumes, embed=None):
+    # Resume x job relevance in one pass: the weighted score and each part
+    parts = {"skills": skill_overlap(jobs, resumes), "experience": experience_fit(jobs, resumes)}
+    if embed is not None:
+        try:
+            parts["similarity"] = embedding_similarity(jobs, resumes, embed)
+        except Exception:
+            pass
+    total_weight = sum(WEIGHTS[name] for name in parts)
+    scores = sum(WEIGHTS[name] * values for name, values in parts.items()) / total_weight
+    return scores, parts
+
+
+def select_jobs(scores, top_k=TOP_K, min_score=MIN_SCORE):
+    # Per resume (row): the top_k jobs above min_score, and always at least the best match
+    order = np.argsort(-scores, axis=1, kind="stable")
+    selected = np.zeros(scores.shape, dtype=bool)
+    rows = np.arange(scores.shape[0])[:, None]
+    top = order[:, :top_k]
+    selected[rows, top] = scores[rows, top] >= min_score
+    selected[np.arange(scores.shape[0]), order[:, 0]] = True
+    return order, selected
+
+
+def rank_jobs(jobs, resume_info, embed=None, top_k=TOP_K, min_score=MIN_SCORE):
+    # Scores every job against the resume in one pass and marks the ones worth
+    # an email: the top_k above min_score, and always at least the best match
+    if not jobs:
+        return []
+    jobs = [Job.from_dict(job) for job in jobs]
+    resume_info = ResumeInfo.from_dict(resume_info)
+    scores, parts = score_matrix(jobs, [resume_info], embed)
+    order, selected = select_jobs(scores, top_k, min_score)
+
+    return [
+        {
+            "index": int(index),
+            "role": jobs[index].role,
+            "score": round(float(scores[0, index]), 4),
+            **{name: round(float(values[0, index]), 4) for name, values in parts.items()},
+            "required_years": required_years(jobs[index]),
+            "selected": bool(selected[0, index])
+        }
+        for index in order[0]
+    ]
@@ -0,0 +1,285 @@
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+
+from admission import admission_mode, get_admission
+from documents import read_bounded
+from ledger import usage_scope
+from models import json_default
+from pipeline import STAGES, run_pipeline
+from prefetch import get_prefetcher
+from result_store import get_result_store
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tenant_id TEXT,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL DEFAULT 0,
+    payload TEXT NOT NULL,
+    resume BLOB,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# Added after the first release; older databases get the column on startup
+OWNER_INDEX = "CREATE INDEX IF NOT EXISTS jobs_owner_status ON jobs (owner, status, created_at)"
+
+
+_local_owners = set()
+
+
+def _process_alive(owner):
+    # Owners are "host:pid:instance"; a process on another host is assumed alive
+    try:
+        host, pid, _ = owner.split(":")
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return False
+    if host != socket.gethostname():
+        return True
+    if pid == os.getpid():
+        # A restarted container often reuses the pid; only this process's queues count
+        return owner in _local_owners
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# SQLite-backed generation queue served by a pool of worker threads, so work
+# outlives the Streamlit script run that submitted it. Several processes may
+# share the database: each queue only claims the jobs it submitted, since the
+# portfolios they need live in its memory.
+class JobQueue:
+    def __init__(self, chain, db_path=None, workers=4, pipeline=run_pipeline, retention_seconds=24 * 3600, result_store=None,
+                 prefetcher=None, admission=None, prefetch_wait_seconds=30.0):
+        self.chain = chain
+        self.admission = admission or get_admission()
+        self.result_store = result_store
+        self.prefetcher = prefetcher
+        self.prefetch_wait_seconds = prefetch_wait_seconds
+        self.db_path = db_path or os.path.join(tempfile.gettempdir(), "cold_email_jobs.sqlite3")
+        self.pipeline = pipeline
+        self.retention_seconds = retention_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        _local_owners.add(self.owner)
+        # Portfolios live in the submitting session; workers reach them by tenant id
+        self._portfolios = weakref.WeakValueDictionary()
+        self._wakeup = threading.Condition()
+        self._stopped = False
+        self._init_db()
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            if "owner" not in {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            conn.execute(OWNER_INDEX)
+            # Jobs left unfinished by a process that has exited lost their
+            # portfolio with it; jobs of live processes are left alone
+            owners = [row["owner"] for row in conn.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            )]
+            for owner in owners:
+                if not _process_alive(owner):
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?) AND owner IS ?",
+                        (FAILED, "Server restarted before the job finished", time.time(), QUEUED, RUNNING, owner)
+                    )
+            conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.retention_seconds,)
+            )
+        finally:
+            conn.close()
+
+    def submit(self, portfolio, resume_bytes, file_type, job_input, input_method, variants=1):
+        # Oversized resumes are refused here rather than stored and failed later
+        resume_bytes = read_bounded(resume_bytes)
+        job_id = uuid.uuid4().hex
+        self._portfolios[portfolio.tenant_id] = portfolio
+        payload = json.dumps({"file_type": file_type, "job_input": job_input, "input_method": input_method,
+                              "variants": variants})
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, tenant_id, owner, status, stage, payload, resume, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, portfolio.tenant_id, self.owner, QUEUED, None, payload, resume_bytes, time.time())
+            )
+        finally:
+            conn.close()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT id, owner, status, stage, progress, result, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["stage_label"] = STAGES.get(job["stage"], ("⏳ Waiting for a free worker...", 0))[0]
+        job["queue_position"] = self._queue_position(job) if job["status"] == QUEUED else 0
+        return job
+
+    def _queue_position(self, job):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE owner IS ? AND status = ? AND created_at <= ?",
+                (job["owner"], QUEUED, job["created_at"])
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _claim_next(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, tenant_id, payload, resume, created_at FROM jobs WHERE owner = ? AND status = ? "
+                "ORDER BY created_at LIMIT 1",
+                (self.owner, QUEUED)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                (RUNNING, time.time(), row["id"])
+            )
+            conn.execute("COMMIT")
+            return dict(row)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _update(self, job_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+        finally:
+            conn.close()
+
+    def _run(self, job):
+        job_id = job["id"]
+        portfolio = self._portfolios.get(job["tenant_id"])
+        if portfolio is None:
+            self._update(job_id, status=FAILED, error="Portfolio session expired", finished_at=time.time())
+            return
+
+        payload = json.loads(job["payload"])
+
+        def progress(stage, fraction):
+            self._update(job_id, stage=stage, progress=fraction)
+
+        # Time spent queued decides how cheaply this job runs; shed jobs fail
+        # fast unless their results are already stored
+        mode = self.admission.admit(time.time() - job["created_at"])
+        try:
+            if self.prefetcher is not None:
+                # A stalled prefetch must not hold the worker: past the timeout
+                # the pipeline runs without it and computes what is missing
+                self.prefetcher.wait(job["tenant_id"], timeout=self.prefetch_wait_seconds)
+            with usage_scope(session=job["tenant_id"]), admission_mode(mode):
+                result = self.pipeline(
+                    self.chain, portfolio, job["resume"], payload["file_type"],
+                    payload["job_input"], payload["input_method"], progress, self.result_store,
+                    payload.get("variants", 1)
+                )
+            self._update(job_id, status=DONE, result=json.dumps(result, default=json_default), progress=1.0, finished_at=time.time())
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+
+    def _worker_loop(self):
+        while not self._stopped:
+            try:
+                job = self._claim_next()
+            except sqlite3.OperationalError:
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=1.0)
+                continue
+            self._run(job)
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        counts = {status: count for status, count in rows}
+        counts["workers"] = len(self._workers)
+        return counts
+
+    def stop(self):
+        self._stopped = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue(chain):
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                chain,
+                db_path=os.getenv("JOB_DB_PATH"),
+                workers=int(os.getenv("JOB_WORKERS", "4")),
+                result_store=get_result_store(),
+                prefetcher=get_prefetcher(chain),
+                prefetch_wait_seconds=float(os.getenv("PREFETCH_WAIT_SECONDS", "30"))
+            )
+        return _job_queue
@@ -0,0 +1,226 @@
+import json
+import re
+
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_OPENERS = re.compile(r"[\[{]")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _drop_trailing_commas(text):
+    # Removes commas right before a closing bracket, leaving string contents alone
+    if not _TRAILING_COMMA.search(text):
+        return text
+    out = []
+    in_string = False
+    escaped = False
+    comma = None
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            comma = None
+        elif char == ",":
+            comma = len(out)
+        elif char in "}]":
+            if comma is not None:
+                del out[comma]
+            comma = None
+        elif not char.isspace():
+            comma = None
+        out.append(char)
+    return "".join(out)
+
+
+def _strip_prose(text):
+    # Every bracket is a possible start of the JSON, since prose before it can
+    # contain brackets too ("see [1]")
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    text = _drop_trailing_commas(text)
+    return (text[match.start():] for match in _OPENERS.finditer(text))
+
+
+def _is_payload(value):
+    # What the prompts ask for: an object, or an array of objects
+    return isinstance(value, dict) or (isinstance(value, list) and bool(value)
+                                       and all(isinstance(item, dict) for item in value))
+
+
+def _close_truncated(text):
+    # Walks the text tracking strings and open containers, cuts it back to the
+    # last point where a value was complete and appends the missing closers.
+    # A string ends a value when it is an array element or follows a key's
+    # colon; a trailing number or literal is dropped, as it may be cut short.
+    stack = []
+    in_string = False
+    escaped = False
+    after_colon = False
+    last_complete = None
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if stack and (stack[-1] == "[" or after_colon):
+                    last_complete = (position + 1, list(stack))
+            continue
+        if char == '"':
+            in_string = True
+        elif char == ":":
+            after_colon = True
+        elif char in _CLOSERS:
+            stack.append(char)
+            after_colon = False
+        elif char in "}]":
+            if not stack or _CLOSERS[stack[-1]] != char:
+                break
+            stack.pop()
+            after_colon = False
+            if not stack:
+                return text[:position + 1]
+            last_complete = (position + 1, list(stack))
+        elif char == "," and stack:
+            after_colon = False
+            last_complete = (position, list(stack))
+
+    if last_complete is None:
+        return None
+    end, open_stack = last_complete
+    return text[:end] + "".join(_CLOSERS[char] for char in reversed(open_stack))
+
+
+def _decode(candidate):
+    try:
+        value, _ = json.JSONDecoder().raw_decode(candidate)
+        return value
+    except ValueError:
+        pass
+    repaired = _close_truncated(candidate)
+    if repaired is None:
+        raise ValueError("Unable to repair LLM JSON output")
+    return json.loads(_drop_trailing_commas(repaired))
+
+
+def parse_llm_json(text):
+    # Tolerant parse of an LLM's JSON answer: ignores surrounding prose and code
+    # fences, drops trailing commas and repairs output cut off mid-array/object.
+    # The answer is the first bracket that decodes to an object or an array of
+    # objects; failing that, the first one that decodes at all.
+    if not text:
+        raise ValueError("Empty LLM output")
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    fallback = None
+    found = False
+    for candidate in _strip_prose(text):
+        found = True
+        try:
+            value = _decode(candidate)
+        except ValueError:
+            continue
+        if _is_payload(value):
+            return value
+        if fallback is None:
+            fallback = (value,)
+    if not found:
+        raise ValueError("No JSON found in LLM output")
+    if fallback is None:
+        raise ValueError("Unable to repair LLM JSON output")
+    return fallback[0]
+
+
+# Fed streamed tokens, returns every top-level object as soon as it closes:
+# the elements of a top-level array, or the object itself if that is the root.
+# A bracket only becomes the root once the token after it fits (an object or
+# "]" inside an array, a key or "}" inside an object), and a root that closes
+# without yielding anything is dropped, so brackets in prose are skipped.
+class IncrementalJSONParser:
+    def __init__(self):
+        self.done = False
+        self.skipped = 0
+        self._reset()
+
+    def _reset(self):
+        self._root = None
+        self._checked = False
+        self._emitted = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current = None
+
+    def _object_depth(self):
+        return 2 if self._root == "[" else 1
+
+    def feed(self, chunk):
+        completed = []
+        for char in chunk:
+            if self.done:
+                break
+            if self._root is not None and not self._checked and not char.isspace():
+                if char in ("{]" if self._root == "[" else '"}'):
+                    self._checked = True
+                else:
+                    self._reset()
+            if self._root is None:
+                if char not in "[{":
+                    continue
+                self._root = char
+
+            if self._current is not None:
+                self._current.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+                if char == "{" and self._depth == self._object_depth() and self._current is None:
+                    self._current = [char]
+            elif char in "]}":
+                if char == "}" and self._depth == self._object_depth() and self._current is not None:
+                    text = "".join(self._current)
+                    self._current = None
+                    try:
+                        value = json.loads(text)
+                    except ValueError:
+                        try:
+                            value = parse_llm_json(text)
+                        except ValueError:
+                            value = None
+                    if isinstance(value, dict):
+                        completed.append(value)
+                    else:
+                        # A malformed element is dropped; the rest still stream
+                        self.skipped += 1
+                    self._emitted += 1
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._emitted:
+                        self.done = True
+                    else:
+                        self._reset()
+        return completed
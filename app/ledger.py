@@ -0,0 +1,365 @@
+import atexit
+import contextvars
+import csv
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+# USD per million (prompt, completion) tokens, from Groq's price list
+PRICES = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08)
+}
+
+# Rough chars-per-token ratio used when a response carries no usage metadata
+CHARS_PER_TOKEN = 4
+
+COLUMNS = ("created_at", "session", "batch", "method", "model", "prompt_tokens", "completion_tokens",
+           "latency", "cost", "estimated", "error")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_usage (
+    created_at REAL NOT NULL,
+    session TEXT,
+    batch TEXT,
+    method TEXT NOT NULL,
+    model TEXT,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    latency REAL NOT NULL,
+    cost REAL NOT NULL,
+    estimated INTEGER NOT NULL,
+    error INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_usage_session ON llm_usage (session, created_at);
+"""
+
+# Who the current Chain call is billed to; set with usage_scope() and carried
+# into worker threads that copy the context
+_scope = contextvars.ContextVar("ledger_scope", default=(None, None))
+
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+
+@contextmanager
+def usage_scope(session=None, batch=None):
+    current_session, current_batch = _scope.get()
+    token = _scope.set((session or current_session, batch or current_batch))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def current_scope():
+    return _scope.get()
+
+
+def price(model, prompt_tokens, completion_tokens):
+    prompt_price, completion_price = PRICES.get(model, (
+        float(os.getenv("LLM_PROMPT_PRICE", "0")), float(os.getenv("LLM_COMPLETION_PRICE", "0"))
+    ))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def message_usage(message):
+    # (prompt, completion) tokens reported by the provider, or None
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage")
+    if token_usage:
+        return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+    return None
+
+
+class Totals:
+    __slots__ = ("calls", "prompt_tokens", "completion_tokens", "latency", "cost", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency = 0.0
+        self.cost = 0.0
+        self.errors = 0
+
+    def add(self, row):
+        self.calls += 1
+        self.prompt_tokens += row["prompt_tokens"]
+        self.completion_tokens += row["completion_tokens"]
+        self.latency += row["latency"]
+        self.cost += row["cost"]
+        self.errors += row["error"]
+
+    @property
+    def tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens": self.tokens,
+            "cost": round(self.cost, 6),
+            "avg_latency": round(self.latency / self.calls, 3) if self.calls else 0.0,
+            "errors": self.errors
+        }
+
+
+class TrackedCall:
+    # One Chain method call: collects usage from every response it produces and
+    # falls back to a character estimate when the provider reports none
+    __slots__ = ("prompt_chars", "completion_chars", "prompt_tokens", "completion_tokens", "reported")
+
+    def __init__(self, prompt_chars):
+        self.prompt_chars = prompt_chars
+        self.completion_chars = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.reported = False
+
+    def add(self, message):
+        self.completion_chars += len(str(message.content))
+        usage = message_usage(message)
+        if usage is not None:
+            self.reported = True
+            self.prompt_tokens += usage[0]
+            self.completion_tokens += usage[1]
+
+    def tokens(self):
+        if self.reported:
+            return self.prompt_tokens, self.completion_tokens
+        return self.prompt_chars // CHARS_PER_TOKEN, self.completion_chars // CHARS_PER_TOKEN
+
+
+# Token, cost and latency accounting for Chain calls. Totals are kept in memory
+# per method, per session and per batch; rows are buffered and appended to a
+# SQLite table or a CSV file (by extension) every `flush_rows` calls, every
+# `flush_seconds` and at exit. A session over its token or dollar budget is
+# either refused (BudgetExceeded) or slowed down by `throttle_seconds` per call.
+# Sessions and batches idle for `idle_seconds` are dropped from memory once
+# their rows are flushed; with a SQLite ledger a session's totals are read back
+# from it when the session returns, so its totals and budget still hold.
+class Ledger:
+    def __init__(self, path=None, flush_rows=50, flush_seconds=10.0, session_tokens=0, session_cost=0.0,
+                 budget_mode="refuse", throttle_seconds=5.0, idle_seconds=3600.0):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.session_tokens = session_tokens
+        self.session_cost = session_cost
+        self.budget_mode = budget_mode
+        self.throttle_seconds = throttle_seconds
+        self.idle_seconds = idle_seconds
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._methods = {}
+        self._sessions = {}
+        self._batches = {}
+        # session / batch -> time.monotonic() of its last recorded call
+        self._last_used = {"session": {}, "batch": {}}
+        self._last_evict = time.monotonic()
+
+    def _persistent(self):
+        return self.path is not None and not self.path.endswith(".csv")
+
+    def _restore(self, session):
+        # Totals of a session dropped from memory, read back from the SQLite
+        # ledger; flushed rows are all that is left of it
+        if session in self._sessions or not self._persistent() or not os.path.exists(self.path):
+            return
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            rows = conn.execute(
+                "SELECT method, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(latency), SUM(cost), "
+                "SUM(error) FROM llm_usage WHERE session = ? GROUP BY method",
+                (session,)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return
+        finally:
+            conn.close()
+        if not rows:
+            return
+        methods = {}
+        for method, *values in rows:
+            totals = methods[method] = Totals()
+            for name, value in zip(Totals.__slots__, values):
+                setattr(totals, name, value)
+        with self._lock:
+            self._sessions.setdefault(session, methods)
+            self._last_used["session"][session] = time.monotonic()
+
+    def _evict_idle(self, now):
+        # Called with the lock held. Unflushed rows keep their session and
+        # batch; without a file there is nothing to wait for.
+        self._last_evict = now
+        pending = {kind: {row[kind] for row in self._pending} for kind in ("session", "batch")}
+        for kind, totals in (("session", self._sessions), ("batch", self._batches)):
+            last_used = self._last_used[kind]
+            for key in [key for key, used in last_used.items()
+                        if now - used >= self.idle_seconds and key not in pending[kind]]:
+                del last_used[key]
+                totals.pop(key, None)
+
+    def _over_budget(self, session):
+        totals = _combine(self._sessions.get(session, {}))
+        return (self.session_tokens and totals.tokens >= self.session_tokens) or \
+            (self.session_cost and totals.cost >= self.session_cost)
+
+    def admit(self, method):
+        # Called before each LLM call; only calls billed to a session are budgeted
+        session, _ = current_scope()
+        if session is None:
+            return
+        self._restore(session)
+        with self._lock:
+            over = self._over_budget(session)
+        if not over:
+            return
+        if self.budget_mode == "throttle":
+            time.sleep(self.throttle_seconds)
+        else:
+            raise BudgetExceeded(f"This session has used its LLM budget; {method} was not run")
+
+    @contextmanager
+    def track(self, method, model, prompt_chars=0, admit=True):
+        # `admit=False` when the caller already ran admit()
+        if admit:
+            self.admit(method)
+        call = TrackedCall(prompt_chars)
+        started = time.perf_counter()
+        error = 0
+        try:
+            yield call
+        except Exception:
+            error = 1
+            raise
+        finally:
+            prompt_tokens, completion_tokens = call.tokens()
+            self.record(method, model, prompt_tokens, completion_tokens, time.perf_counter() - started,
+                        estimated=not call.reported, error=error)
+
+    def record(self, method, model, prompt_tokens, completion_tokens, latency, estimated=False, error=0):
+        session, batch = current_scope()
+        row = {
+            "created_at": time.time(),
+            "session": session,
+            "batch": batch,
+            "method": method,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency": latency,
+            "cost": price(model, prompt_tokens, completion_tokens),
+            "estimated": int(estimated),
+            "error": error
+        }
+        now = time.monotonic()
+        with self._lock:
+            self._methods.setdefault(method, Totals()).add(row)
+            if session is not None:
+                self._sessions.setdefault(session, {}).setdefault(method, Totals()).add(row)
+                self._last_used["session"][session] = now
+            if batch is not None:
+                self._batches.setdefault(batch, {}).setdefault(method, Totals()).add(row)
+                self._last_used["batch"][batch] = now
+            if now - self._last_evict >= min(self.idle_seconds, 60.0):
+                self._evict_idle(now)
+            if self.path is None:
+                return
+            self._pending.append(row)
+            due = len(self._pending) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not rows or self.path is None:
+            return
+        # Writers take turns so CSV rows never interleave
+        with self._flush_lock:
+            if self.path.endswith(".csv"):
+                self._write_csv(rows)
+            else:
+                self._write_sqlite(rows)
+
+    def _write_csv(self, rows):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            if new_file:
+                writer.writeheader()
+            writer.writerows(rows)
+
+    def _write_sqlite(self, rows):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"INSERT INTO llm_usage ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [tuple(row[column] for column in COLUMNS) for row in rows]
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def summary(self, session=None, batch=None):
+        # Overall and per-method totals for one session, one batch or the whole process
+        if session is not None:
+            self._restore(session)
+        with self._lock:
+            if session is not None:
+                methods = self._sessions.get(session, {})
+            elif batch is not None:
+                methods = self._batches.get(batch, {})
+            else:
+                methods = self._methods
+            report = dict(_combine(methods).to_dict(), methods={name: totals.to_dict() for name, totals in methods.items()})
+            if session is not None:
+                report.update(budget_tokens=self.session_tokens, budget_cost=self.session_cost,
+                              over_budget=bool(self._over_budget(session)))
+            return report
+
+
+def _combine(methods):
+    overall = Totals()
+    for totals in methods.values():
+        for name in Totals.__slots__:
+            setattr(overall, name, getattr(overall, name) + getattr(totals, name))
+    return overall
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            path = os.getenv("LEDGER_PATH", os.path.join(tempfile.gettempdir(), "cold_email_ledger.sqlite3"))
+            _ledger = Ledger(
+                path=path or None,
+                session_tokens=int(os.getenv("SESSION_TOKEN_BUDGET", "0")),
+                session_cost=float(os.getenv("SESSION_COST_BUDGET", "0")),
+                budget_mode=os.getenv("SESSION_BUDGET_MODE", "refuse"),
+                throttle_seconds=float(os.getenv("SESSION_THROTTLE_SECONDS", "5")),
+                idle_seconds=float(os.getenv("LEDGER_IDLE_SECONDS", "3600"))
+            )
+            atexit.register(_ledger.flush)
+        return _ledger
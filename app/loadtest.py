@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from api import create_app
+from chains import Chain
+from fake_llm import FakeChatModel
+from portfolio import Portfolio
+
+
+RESUME_TEXT = "Jordan Lee - Software Engineer. Skills: Python, React, PostgreSQL. Experience: 2 years at Acme."
+JOB_TEXT = "Backend Engineer at Example Corp. 2+ years of experience with Python, Django and PostgreSQL."
+
+
+def keyword_portfolio_factory(store, tenant_id):
+    # Keyword matching keeps the load test independent of the embedding model
+    portfolio = Portfolio(csv_data=store, tenant_id=tenant_id)
+    portfolio.vector_store = None
+    return portfolio
+
+
+def start_server(port, latency, pool_size, max_concurrency):
+    app = create_app(
+        chain_factory=lambda: Chain(llm=FakeChatModel(latency=latency)),
+        portfolio_factory=keyword_portfolio_factory,
+        pool_size=pool_size,
+        max_concurrency=max_concurrency
+    )
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def run_load(base_url, endpoint, total, concurrency):
+    payloads = {
+        "/generate": {"resume_text": RESUME_TEXT, "job_text": JOB_TEXT},
+        "/jobs/parse": {"job_text": JOB_TEXT},
+        "/resume/extract": {"resume_text": RESUME_TEXT},
+        "/portfolio/query": {"skills": ["Python", "React"]}
+    }
+    payload = payloads[endpoint]
+    latencies = []
+    statuses = {}
+    remaining = iter(range(total))
+
+    async def worker(client):
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.post(endpoint, json=payload)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "endpoint": endpoint,
+        "requests": total,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+        "statuses": statuses
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the generation API against a fake LLM")
+    parser.add_argument("--endpoint", default="/generate")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM latency per call in seconds")
+    parser.add_argument("--pool-size", type=int, default=16)
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server, thread = start_server(args.port, args.latency, args.pool_size, args.max_concurrency)
+    try:
+        report = asyncio.run(run_load(f"http://127.0.0.1:{args.port}", args.endpoint, args.requests, args.concurrency))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+    for key, value in report.items():
+        print(f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
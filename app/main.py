@@ -1,30 +1,22 @@
+import time
 import streamlit as st
-from langchain_community.document_loaders import WebBaseLoader
-import PyPDF2
-import docx
-import pandas as pd
-from io import BytesIO
 
 from chains import Chain
+from documents import MAX_DOCUMENT_BYTES
+from jobs import FAILED, QUEUED, RUNNING, get_job_queue
+from ledger import get_ledger
 from portfolio import Portfolio
-from utils import clean_text, validate_csv_structure
+from prefetch import get_prefetcher
+from project_store import ProjectStore
+from result_store import content_hash, email_diff
+from startup import start_warm_up
+from utils import clean_text, iter_csv_chunks
 
 
-def extract_text_from_pdf(pdf_file):
-    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_file.read()))
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-
-def extract_text_from_docx(docx_file):
-    doc = docx.Document(BytesIO(docx_file.read()))
-    text = ""
-    for paragraph in doc.paragraphs:
-        text += paragraph.text + "\n"
-    return text
-
+PREFETCH_MIN_JOB_TEXT = 80
+JOB_POLL_SECONDS = 0.75
+# Finished runs kept in the session for the results picker
+RESULTS_KEPT = 10
 
 def add_custom_css():
     st.markdown("""
@@ -286,6 +278,9 @@ def add_custom_css():
     """, unsafe_allow_html=True)
 
 
+# A fragment: widgets in the sidebar rerun only the sidebar, and the uploaded
+# CSV is ingested once per distinct file rather than on every rerun
+@st.fragment
 def create_sidebar_content(portfolio):
     st.markdown("""
     <div class="sidebar-section">
@@ -318,18 +313,34 @@ def create_sidebar_content(portfolio):
         
         if uploaded_csv is not None:
             try:
-                projects_df = pd.read_csv(uploaded_csv)
-                is_valid, message = validate_csv_structure(projects_df)
+                csv_hash = content_hash(uploaded_csv.getvalue())
+                if st.session_state.get("portfolio_csv") != csv_hash:
+                    progress_bar = st.progress(0.0, text="Indexing projects...")
+                    
+                    def update_progress(loaded, fraction):
+                        progress_bar.progress(fraction or 0.0, text=f"Indexed {loaded} projects...")
+                    
+                    st.session_state.portfolio_csv_status = portfolio.ingest_chunks(iter_csv_chunks(uploaded_csv), update_progress)
+                    st.session_state.portfolio_csv = csv_hash
+                    progress_bar.empty()
+                    # The rest of the page depends on the project count
+                    st.rerun()
+                
+                is_valid, message = st.session_state.portfolio_csv_status
+                projects = portfolio.store
                 
                 if is_valid:
-                    portfolio.update_data(projects_df)
-                    st.success(f"✅ Successfully loaded {len(projects_df)} projects!")
+                    st.success(f"✅ Successfully loaded {len(projects)} projects!")
                     
                     with st.expander("📊 Project Preview", expanded=False):
-                        preview_df = projects_df[['Project_Name', 'Tech_Stack']].head(3)
+                        import pandas as pd
+                        preview_df = pd.DataFrame({
+                            'Project_Name': projects.columns['name'][:3],
+                            'Tech_Stack': projects.columns['tech_stack'][:3]
+                        })
                         st.dataframe(preview_df, use_container_width=True, hide_index=True)
-                        if len(projects_df) > 3:
-                            st.caption(f"... and {len(projects_df) - 3} more projects")
+                        if len(projects) > 3:
+                            st.caption(f"... and {len(projects) - 3} more projects")
                 else:
                     st.error(f"❌ Invalid CSV format: {message}")
             except Exception as e:
@@ -350,6 +361,7 @@ def create_sidebar_content(portfolio):
         if st.button("🔄 Load Sample Projects", use_container_width=True):
             sample_data = create_sample_portfolio_data()
             portfolio.update_data(sample_data)
+            st.session_state.portfolio_csv = None
             st.success(f"✅ Loaded {len(sample_data)} sample projects!")
             st.rerun()
         
@@ -368,6 +380,10 @@ def create_sidebar_content(portfolio):
     
     st.markdown("---")
     
+    create_usage_summary(get_ledger().summary(session=portfolio.tenant_id))
+    
+    st.markdown("---")
+    
     st.markdown("""
     <div class="sidebar-section">
         <div class="sidebar-header">
@@ -419,7 +435,68 @@ def create_sidebar_content(portfolio):
     """, unsafe_allow_html=True)
 
 
+def create_usage_summary(usage):
+    st.markdown('<div class="sidebar-subheader"><i>• AI Usage This Session</i></div>', unsafe_allow_html=True)
+    
+    col1, col2 = st.columns(2)
+    col1.metric("Tokens", f"{usage['tokens']:,}")
+    col2.metric("Cost", f"${usage['cost']:.4f}")
+    
+    if usage["budget_tokens"]:
+        used = min(usage["tokens"] / usage["budget_tokens"], 1.0)
+        st.progress(used, text=f"{used:.0%} of {usage['budget_tokens']:,} token budget")
+    if usage["over_budget"]:
+        st.warning("⚠️ Session budget reached; new generations may be slowed or refused")
+    
+    if usage["methods"]:
+        with st.expander("📊 Usage by step", expanded=False):
+            import pandas as pd
+            st.dataframe(pd.DataFrame([
+                {
+                    "Step": method,
+                    "Calls": totals["calls"],
+                    "Prompt": totals["prompt_tokens"],
+                    "Completion": totals["completion_tokens"],
+                    "Avg s": totals["avg_latency"]
+                }
+                for method, totals in usage["methods"].items()
+            ]), use_container_width=True, hide_index=True)
+
+
+def bounded_upload(uploaded_file):
+    # Streamlit itself accepts uploads up to server.maxUploadSize (200MB by
+    # default); larger resumes are turned away before they are copied, queued
+    # or prefetched
+    if uploaded_file is not None and uploaded_file.size > MAX_DOCUMENT_BYTES:
+        st.error(f"❌ {uploaded_file.name} is larger than {MAX_DOCUMENT_BYTES // (1024 * 1024)}MB. Please upload a smaller file.")
+        return None
+    return uploaded_file
+
+
+def start_prefetch(prefetcher, session, uploaded_file, job_input, input_method):
+    if uploaded_file is not None:
+        prefetcher.prefetch_resume(session, uploaded_file.getvalue(), uploaded_file.type)
+    else:
+        prefetcher.cancel(session, "resume")
+    
+    # Skip half-typed inputs; they would only be cancelled again. A crawl costs
+    # one LLM call per page, so it only starts when the user asks for it
+    text = job_input.strip()
+    if input_method == "crawl":
+        worth_fetching = False
+    elif input_method == "url":
+        worth_fetching = text.startswith(("http://", "https://")) and "." in text
+    else:
+        worth_fetching = len(text) >= PREFETCH_MIN_JOB_TEXT
+    if worth_fetching:
+        prefetcher.prefetch_jobs(session, job_input, input_method)
+    else:
+        prefetcher.cancel(session, "jobs")
+
+
 def create_streamlit_app(llm, portfolio, clean_text):
+    job_queue = get_job_queue(llm)
+    prefetcher = get_prefetcher(llm)
     add_custom_css()
     
     st.title(" Cold Email Generator for Job Seekers")
@@ -428,6 +505,21 @@ def create_streamlit_app(llm, portfolio, clean_text):
     with st.sidebar:
         create_sidebar_content(portfolio)
     
+    generation_form(job_queue, prefetcher, portfolio)
+    
+    if st.session_state.get("job_id"):
+        job_progress(job_queue)
+    if st.session_state.get("job_error"):
+        st.error(f"❌ An error occurred: {st.session_state.job_error}")
+        st.info("💡 Please check your inputs and try again. Make sure your resume file is readable and job information is complete.")
+    
+    results_view()
+
+
+# Typing, uploading and toggling inputs rerun only this fragment, so the cost of
+# an interaction does not grow with the results rendered below it
+@st.fragment
+def generation_form(job_queue, prefetcher, portfolio):
     with st.container():
         st.markdown('<div class="step-header">📄 Step 1: Upload Your Resume</div>', unsafe_allow_html=True)
         
@@ -450,7 +542,8 @@ def create_streamlit_app(llm, portfolio, clean_text):
                 help="Upload your resume file",
                 label_visibility="collapsed"
             )
-            st.markdown('<p class="instruction-text">📎 Drag and drop or browse. Accepts PDF, DOCX, TXT • Max size: 200MB</p>', unsafe_allow_html=True)
+            st.markdown(f'<p class="instruction-text">📎 Drag and drop or browse. Accepts PDF, DOCX, TXT • Max size: {MAX_DOCUMENT_BYTES // (1024 * 1024)}MB</p>', unsafe_allow_html=True)
+            uploaded_file = bounded_upload(uploaded_file)
             
             if uploaded_file is not None:
                 st.success("✅ File uploaded!")
@@ -465,7 +558,8 @@ def create_streamlit_app(llm, portfolio, clean_text):
                     help="Upload your resume file",
                     label_visibility="collapsed"
                 )
-                st.markdown('<p class="instruction-text">📎 Drag and drop or browse. Accepts PDF, DOCX, TXT • Max size: 200MB</p>', unsafe_allow_html=True)
+                st.markdown(f'<p class="instruction-text">📎 Drag and drop or browse. Accepts PDF, DOCX, TXT • Max size: {MAX_DOCUMENT_BYTES // (1024 * 1024)}MB</p>', unsafe_allow_html=True)
+                uploaded_file = bounded_upload(uploaded_file)
             
             with col2:
                 if uploaded_file is not None:
@@ -497,6 +591,16 @@ def create_streamlit_app(llm, portfolio, clean_text):
                 help="Direct link to the job posting page"
             )
             st.markdown('<p class="instruction-text">🌐 Example: https://jobs.nike.com/job/R-33460 or similar career page URLs</p>', unsafe_allow_html=True)
+            crawl_site = st.checkbox(
+                "🕸️ Crawl the whole careers site",
+                help="Follow pagination, sitemaps and links to individual postings instead of reading only this page"
+            )
+    
+    if "Text" in input_method:
+        input_method = "text"
+    else:
+        input_method = "crawl" if crawl_site else "url"
+    start_prefetch(prefetcher, portfolio.tenant_id, uploaded_file, job_input, input_method)
     
     ready_to_generate = bool(uploaded_file and job_input.strip() and portfolio.get_projects_count() > 0)
     
@@ -511,6 +615,14 @@ def create_streamlit_app(llm, portfolio, clean_text):
         
         st.warning(f"⚠️ Please complete: {', '.join(missing_items)}")
     
+    variants = st.slider(
+        "Email variants",
+        min_value=1,
+        max_value=5,
+        value=1,
+        help="Generate several versions in one go; the best-scoring one is shown first"
+    )
+    
     generate_button = st.button(
         "🚀 Generate Cold Email",
         type="primary",
@@ -522,72 +634,141 @@ def create_streamlit_app(llm, portfolio, clean_text):
     st.markdown('</div>', unsafe_allow_html=True)
 
     if generate_button:
-        try:
-            with st.spinner("🔄 Processing your information and generating personalized email..."):
-                if uploaded_file.type == "application/pdf":
-                    resume_text = extract_text_from_pdf(uploaded_file)
-                elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                    resume_text = extract_text_from_docx(uploaded_file)
-                else:
-                    resume_text = str(uploaded_file.read(), "utf-8")
-                
-                resume_info = llm.extract_resume_info(resume_text)
-                
-                if "Text" in input_method:
-                    job_data = llm.parse_job_description(job_input)
-                    jobs = [job_data] if not isinstance(job_data, list) else job_data
-                else:
-                    loader = WebBaseLoader([job_input])
-                    data = clean_text(loader.load().pop().page_content)
-                    jobs = llm.extract_jobs(data)
-                
-                portfolio.load_portfolio()
-            
-            st.markdown("---")
-            st.header("📊 Analysis Results")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                with st.expander("📄 Your Resume Analysis", expanded=False):
-                    st.json(resume_info)
-            
-            with col2:
-                with st.expander("💼 Job Analysis", expanded=False):
-                    for i, job in enumerate(jobs):
-                        if len(jobs) > 1:
-                            st.subheader(f"Job {i+1}")
-                        st.json(job)
-            
-            st.header("📧 Generated Cold Email(s)")
-            
+        st.session_state.job_id = job_queue.submit(
+            portfolio,
+            uploaded_file.getvalue(),
+            uploaded_file.type,
+            job_input,
+            input_method,
+            variants
+        )
+        st.session_state.job_error = None
+        # Starts the progress fragment, which only runs while a job is active
+        st.rerun()
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_queue):
+    # Polls the worker thread without rerunning the page; one full rerun once
+    # the job ends moves it into the results history
+    job = job_queue.get(st.session_state.get("job_id"))
+    if job is None:
+        st.session_state.job_id = None
+        return
+    
+    if job["status"] in (QUEUED, RUNNING):
+        if job["status"] == QUEUED and job["queue_position"] > 1:
+            label = f"⏳ Waiting in queue (position {job['queue_position']})..."
+        else:
+            label = job["stage_label"]
+        st.progress(job["progress"] or 0.0, text=label)
+        return
+    
+    st.session_state.job_id = None
+    if job["status"] == FAILED:
+        st.session_state.job_error = job["error"]
+    else:
+        results = st.session_state.setdefault("results", [])
+        results.append({"finished_at": job["finished_at"], "result": job["result"]})
+        del results[:-RESULTS_KEPT]
+        st.session_state.shown_result = len(results) - 1
+    st.rerun()
+
+
+# Only the selected run is rendered, however many have piled up, and switching
+# between runs reruns only this fragment
+@st.fragment
+def results_view():
+    results = st.session_state.get("results") or []
+    if not results:
+        return
+    
+    index = len(results) - 1
+    if len(results) > 1:
+        index = st.selectbox(
+            "Results",
+            range(len(results)),
+            index=min(st.session_state.get("shown_result", index), len(results) - 1),
+            format_func=lambda n: f"Run {n + 1} • {time.strftime('%H:%M:%S', time.localtime(results[n]['finished_at']))} • "
+                                  f"{len(results[n]['result']['emails'])} email(s)",
+            help="Earlier runs in this session"
+        )
+        st.session_state.shown_result = index
+    render_results(results[index]["result"])
+
+
+def render_results(result):
+    resume_info = result["resume_info"]
+    jobs = result["jobs"]
+    
+    st.markdown("---")
+    st.header("📊 Analysis Results")
+    
+    if result.get("mode", "normal") != "normal":
+        st.info("ℹ️ The service was busy, so this run used a lighter pipeline: keyword project matching, "
+                "resume details read without the AI and a single email per job. Generate again later for full results.")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        with st.expander("📄 Your Resume Analysis", expanded=False):
+            st.json(resume_info)
+    
+    with col2:
+        with st.expander("💼 Job Analysis", expanded=False):
             for i, job in enumerate(jobs):
-                job_skills = job.get('skills', [])
-                if isinstance(job_skills, str):
-                    job_skills = [job_skills]
-                
-                relevant_projects = portfolio.query_links(job_skills + resume_info.get('skills', []))
-                
-                email = llm.write_candidate_email(job, resume_info, relevant_projects)
-                
                 if len(jobs) > 1:
-                    st.subheader(f"📧 Email {i+1}: {job.get('role', 'Unknown Role')}")
-                
-                st.markdown("### 📝 Your Personalized Cold Email:")
-                st.code(email, language='text')
-                
-                if relevant_projects:
-                    with st.expander(f"🔗 Relevant Projects Used ({len(relevant_projects)} found)"):
-                        for project in relevant_projects:
-                            if isinstance(project, dict) and 'links' in project:
-                                st.markdown(f"• **{project.get('name', 'Project')}**: {project['links']}")
-                
-                if i < len(jobs) - 1:
-                    st.markdown("---")
-                
-        except Exception as e:
-            st.error(f"❌ An error occurred: {str(e)}")
-            st.info("💡 Please check your inputs and try again. Make sure your resume file is readable and job information is complete.")
+                    st.subheader(f"Job {i+1}")
+                st.json(job)
+    
+    ranking = result.get("ranking") or []
+    if len(ranking) > 1:
+        with st.expander(f"🎯 Job Match Ranking ({sum(match['selected'] for match in ranking)} of {len(ranking)} selected)", expanded=False):
+            import pandas as pd
+            st.dataframe(pd.DataFrame(ranking).drop(columns=["index"]), use_container_width=True, hide_index=True)
+    
+    st.header("📧 Generated Cold Email(s)")
+    
+    emails = result["emails"]
+    skipped = len(jobs) - len(emails)
+    if skipped > 0:
+        st.caption(f"🎯 Skipped {skipped} posting(s) that matched your resume poorly; see the match ranking above")
+    for i, entry in enumerate(emails):
+        job = entry["job"]
+        relevant_projects = entry["projects"]
+        
+        if len(emails) > 1:
+            st.subheader(f"📧 Email {i+1}: {job.get('role', 'Unknown Role')}")
+        
+        st.markdown("### 📝 Your Personalized Cold Email:")
+        if entry.get("duplicate_of") is not None:
+            st.caption(f"♻️ Same posting as job {entry['duplicate_of'] + 1} in another location; adapted from that email")
+        elif entry.get("cached"):
+            st.caption("⚡ Reused from a previous run with the same resume, job, portfolio and prompt")
+        if len(entry.get("variants") or []) > 1:
+            tabs = st.tabs([
+                f"{'⭐ ' if n == 0 else ''}Variant {n+1} · score {variant['score']:.2f}"
+                for n, variant in enumerate(entry["variants"])
+            ])
+            for tab, variant in zip(tabs, entry["variants"]):
+                with tab:
+                    st.caption(f"{variant['words']} words • skill coverage {variant['skills']:.0%} • project links {variant['links']:.0%}")
+                    st.code(variant["email"], language='text')
+        else:
+            st.code(entry["email"], language='text')
+        
+        if entry.get("previous"):
+            with st.expander("🔍 What changed since the last version"):
+                st.code(email_diff(entry["previous"], entry["email"]), language='diff')
+        
+        if relevant_projects:
+            with st.expander(f"🔗 Relevant Projects Used ({len(relevant_projects)} found)"):
+                for project in relevant_projects:
+                    if isinstance(project, dict) and 'links' in project:
+                        st.markdown(f"• **{project.get('name', 'Project')}**: {project['links']}")
+        
+        if i < len(emails) - 1:
+            st.markdown("---")
 
 
 def create_sample_portfolio_data():
@@ -635,12 +816,19 @@ def create_sample_portfolio_data():
             'https://expo.dev/@user/weather-app'
         ]
     }
-    return pd.DataFrame(sample_projects)
+    sample_store = ProjectStore()
+    sample_store.extend(sample_projects)
+    return sample_store
 
 
 if __name__ == "__main__":
+    start_warm_up(create_sample_portfolio_data)
     chain = Chain()
-    portfolio = Portfolio()
+    # Streamlit reruns this script on every interaction; keep one portfolio
+    # (one tenant of the shared vector store) per browser session
+    if "portfolio" not in st.session_state:
+        st.session_state.portfolio = Portfolio()
+    portfolio = st.session_state.portfolio
     st.set_page_config(
         layout="wide", 
         page_title="Cold Email Generator for Job Seekers", 
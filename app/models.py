@@ -0,0 +1,186 @@
+import json
+from dataclasses import dataclass, field, fields
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return "; ".join(_text(item) for item in value if item not in (None, ""))
+    if isinstance(value, dict):
+        return ", ".join(f"{key}: {_text(item)}" for key, item in value.items() if item not in (None, ""))
+    return str(value)
+
+
+def _text_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    return [item for item in (_text(item) for item in value) if item]
+
+
+def _dict_list(value):
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        value = [value]
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    return [item if isinstance(item, dict) else {"description": _text(item)} for item in value if item]
+
+
+def _require_mapping(data, model):
+    if not isinstance(data, dict):
+        raise ValidationError(f"{model} must be a JSON object, got {type(data).__name__}")
+
+
+def _require_fields(instance, schema):
+    # Required keys must be present and non-empty once normalized
+    missing = [key for key in schema["required"] if not getattr(instance, key)]
+    if missing:
+        raise ValidationError(f"{type(instance).__name__} is missing required fields: {', '.join(missing)}")
+    return instance
+
+
+def _compact(data):
+    return {key: value for key, value in data.items() if value not in ("", [], None)}
+
+
+class Model:
+    __slots__ = ()
+
+    def to_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def to_prompt(self):
+        # Compact JSON without empty fields keeps prompts (and cache keys) small
+        return json.dumps(_compact(self.to_dict()), ensure_ascii=False, separators=(",", ":"))
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None)
+        return default if value in (None, "", []) else value
+
+
+@dataclass(slots=True)
+class Job(Model):
+    role: str = ""
+    company: str = ""
+    experience: str = ""
+    skills: list = field(default_factory=list)
+    description: str = ""
+    location: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        _require_mapping(data, "Job")
+        return _require_fields(cls(
+            role=_text(data.get("role")),
+            company=_text(data.get("company")),
+            experience=_text(data.get("experience")),
+            skills=_text_list(data.get("skills")),
+            description=_text(data.get("description")),
+            location=_text(data.get("location"))
+        ), JOB_SCHEMA)
+
+
+@dataclass(slots=True)
+class ResumeInfo(Model):
+    name: str = ""
+    email: str = ""
+    phone: str = ""
+    skills: list = field(default_factory=list)
+    experience: list = field(default_factory=list)
+    projects: list = field(default_factory=list)
+    education: str = ""
+    summary: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        _require_mapping(data, "ResumeInfo")
+        return _require_fields(cls(
+            name=_text(data.get("name")),
+            email=_text(data.get("email")),
+            phone=_text(data.get("phone")),
+            skills=_text_list(data.get("skills")),
+            experience=_dict_list(data.get("experience")),
+            projects=_dict_list(data.get("projects")),
+            education=_text(data.get("education")),
+            summary=_text(data.get("summary"))
+        ), RESUME_SCHEMA)
+
+
+@dataclass(slots=True)
+class Project(Model):
+    name: str = ""
+    description: str = ""
+    tech_stack: str = ""
+    links: str = ""
+    github: str = ""
+    demo: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        _require_mapping(data, "Project")
+        return cls(**{f.name: _text(data.get(f.name)) for f in fields(cls)})
+
+
+JOB_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "role": {"type": "string"},
+        "company": {"type": "string"},
+        "experience": {"type": "string"},
+        "skills": {"type": "array", "items": {"type": "string"}},
+        "description": {"type": "string"},
+        "location": {"type": "string"}
+    },
+    "required": ["role", "skills", "description"]
+}
+
+RESUME_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "email": {"type": "string"},
+        "phone": {"type": "string"},
+        "skills": {"type": "array", "items": {"type": "string"}},
+        "experience": {"type": "array", "items": {
+            "type": "object",
+            "properties": {"company": {"type": "string"}, "role": {"type": "string"},
+                           "duration": {"type": "string"}, "achievements": {"type": "string"}}
+        }},
+        "projects": {"type": "array", "items": {
+            "type": "object",
+            "properties": {"name": {"type": "string"}, "description": {"type": "string"}}
+        }},
+        "education": {"type": "string"},
+        "summary": {"type": "string"}
+    },
+    "required": ["name", "skills"]
+}
+
+
+def schema_prompt(schema):
+    return json.dumps(schema, separators=(",", ":"))
+
+
+def json_default(value):
+    # `default=` hook for json.dumps so models serialize wherever results are persisted
+    if isinstance(value, Model):
+        return value.to_dict()
+    return str(value)
@@ -0,0 +1,210 @@
+import math
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores, k):
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class IVFPartition:
+    __slots__ = ("centroids", "order", "offsets")
+
+    def __init__(self, centroids, order, offsets):
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, matrix, n_lists=None, iterations=8, sample_per_list=64, seed=0):
+        # Spherical k-means on a sample, then every row is assigned to its nearest centroid
+        rows = len(matrix)
+        n_lists = n_lists or max(1, int(math.sqrt(rows)))
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(matrix[np.sort(rng.choice(rows, min(rows, n_lists * sample_per_list), replace=False))])
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=n_lists)
+            filled = counts > 0
+            centroids[filled] = _normalize(sums[filled])
+
+        assignments = np.concatenate([
+            np.argmax(np.asarray(matrix[start:start + 8192]) @ centroids.T, axis=1)
+            for start in range(0, rows, 8192)
+        ])
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=n_lists))))
+        return cls(centroids, order, offsets)
+
+    def candidates(self, query, n_probe):
+        lists = _top_k(self.centroids @ query, n_probe)
+        return np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+
+
+# Chroma-compatible collection over a memory-mapped matrix of unit vectors:
+# queries are one matrix-vector product plus an argpartition top-k, or, past
+# `ivf_min_rows`, the same over the rows of the `n_probe` closest IVF lists.
+# Added rows are buffered and folded into the mapped file on the next query.
+# Adding an id that is already present replaces it, like Chroma's upsert.
+class NumpyCollection:
+    def __init__(self, name, directory, embedding_function=None, ivf_min_rows=20000, n_probe=8):
+        self.name = name
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self.ivf_min_rows = ivf_min_rows
+        self.n_probe = n_probe
+        self._matrix = None
+        self._path = None
+        self._generation = 0
+        self._pending = []
+        self._ivf = None
+        self._ids = []
+        self._metadatas = []
+        # id -> its latest row; earlier rows for a re-added id are dropped on compaction
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def count(self):
+        return len(self._rows)
+
+    def add(self, ids, documents=None, metadatas=None, embeddings=None):
+        if not ids:
+            return
+        if embeddings is None:
+            embeddings = self.embedding_function(list(documents))
+        vectors = _normalize(embeddings)
+        with self._lock:
+            self._pending.append(vectors)
+            for id_ in ids:
+                self._rows[id_] = len(self._ids)
+                self._ids.append(id_)
+            self._metadatas.extend(metadatas or [None] * len(ids))
+
+    def _compact(self):
+        pending = np.concatenate(self._pending)
+        existing = 0 if self._matrix is None else len(self._matrix)
+        keep = np.array([row for row, id_ in enumerate(self._ids) if self._rows[id_] == row], dtype=np.int64)
+        self._generation += 1
+        path = os.path.join(self.directory, f"{self.name}-{self._generation}.f32")
+        matrix = np.memmap(path, dtype=np.float32, mode="w+", shape=(len(keep), pending.shape[1]))
+        if len(keep) == existing + len(pending):
+            if existing:
+                matrix[:existing] = self._matrix
+            matrix[existing:] = pending
+        else:
+            # Some ids were added again: only their latest rows are carried over
+            old, new = keep[keep < existing], keep[keep >= existing] - existing
+            if len(old):
+                matrix[:len(old)] = self._matrix[old]
+            matrix[len(old):] = pending[new]
+            self._ids = [self._ids[row] for row in keep]
+            self._metadatas = [self._metadatas[row] for row in keep]
+            self._rows = {id_: row for row, id_ in enumerate(self._ids)}
+        matrix.flush()
+        del matrix
+        self._release()
+        self._path = path
+        self._matrix = np.memmap(path, dtype=np.float32, mode="r", shape=(len(keep), pending.shape[1]))
+        self._pending = []
+        self._ivf = IVFPartition.build(self._matrix) if len(self._matrix) >= self.ivf_min_rows else None
+
+    def _release(self):
+        self._matrix = None
+        if self._path is not None:
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+            self._path = None
+
+    def query(self, query_texts=None, n_results=10, query_embeddings=None, include=None):
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(list(query_texts))
+        queries = _normalize(query_embeddings)
+        with self._lock:
+            if self._pending:
+                self._compact()
+            matrix, ivf, ids, metadatas = self._matrix, self._ivf, self._ids, self._metadatas
+
+        result = {"ids": [], "distances": [], "metadatas": [], "documents": None}
+        for query in queries:
+            if matrix is None:
+                rows, scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            elif ivf is None:
+                scores = matrix @ query
+                rows = _top_k(scores, n_results)
+                scores = scores[rows]
+            else:
+                candidates = ivf.candidates(query, self.n_probe)
+                candidate_scores = matrix[candidates] @ query
+                best = _top_k(candidate_scores, n_results)
+                rows, scores = candidates[best], candidate_scores[best]
+            result["ids"].append([ids[row] for row in rows])
+            result["distances"].append((1.0 - scores).tolist())
+            result["metadatas"].append([metadatas[row] for row in rows])
+        return result
+
+    def delete(self):
+        with self._lock:
+            self._release()
+            self._pending = []
+            self._ids = []
+            self._metadatas = []
+            self._rows = {}
+            self._ivf = None
+
+
+# Lightweight alternative to Chroma for portfolios that fit a brute-force scan
+class NumpyBackend:
+    name = "numpy"
+
+    def __init__(self, directory=None, ivf_min_rows=20000, n_probe=8):
+        self.directory = directory or tempfile.mkdtemp(prefix="portfolio-vectors-")
+        self.ivf_min_rows = ivf_min_rows
+        self.n_probe = n_probe
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def open_collection(self, name, embedding_function=None):
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = NumpyCollection(name, self.directory, embedding_function, self.ivf_min_rows, self.n_probe)
+                self._collections[name] = collection
+            return collection
+
+    def delete_collection(self, name):
+        with self._lock:
+            collection = self._collections.pop(name, None)
+        if collection is not None:
+            collection.delete()
+
+    def max_batch_size(self):
+        return 4096
+
+    def close(self):
+        with self._lock:
+            for collection in self._collections.values():
+                collection.delete()
+            self._collections.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,305 @@
+import os
+import re
+
+from admission import current_mode, degraded
+from chains import PROMPT_VERSIONS
+from crawler import normalize_url
+from dedup import find_duplicate_groups, tailor_email
+from documents import DOCUMENT_VERSION, extract_document
+from email_scoring import rank_emails
+from job_ranking import rank_jobs
+from models import Job, Project, ResumeInfo
+from replay import PAGE, get_cassette
+from result_store import content_hash
+from singleflight import flight_key, get_single_flight
+from utils import clean_resume_text, clean_text, extract_contact_info, format_skills_list
+
+
+# Characters of resume text the email prompt gets when resume extraction is skipped
+FALLBACK_SUMMARY_CHARS = 1500
+
+# How long jobs read from a URL or a crawl are reused before the site is read
+# again, since postings behind the same URL change; pasted text is kept
+JOBS_TTL_SECONDS = {
+    "url": float(os.getenv("JOBS_URL_TTL_SECONDS", str(6 * 3600))),
+    "crawl": float(os.getenv("JOBS_CRAWL_TTL_SECONDS", str(6 * 3600)))
+}
+
+STAGES = {
+    "resume": ("📄 Reading your resume...", 0.1),
+    "portfolio": ("🗂️ Indexing your portfolio...", 0.2),
+    "job": ("💼 Analyzing the job posting...", 0.3),
+    "email": ("✍️ Writing personalized emails...", 0.6),
+    "done": ("✅ Done", 1.0)
+}
+
+
+def _load_job_page(url):
+    from langchain_community.document_loaders import WebBaseLoader
+    loader = WebBaseLoader([url])
+    return loader.load().pop().page_content
+
+
+def _fetch_job_page(url):
+    # Cleaning stays outside the cassette so replays still exercise it
+    cassette = get_cassette()
+    if cassette is None:
+        return clean_text(_load_job_page(url))
+    return clean_text(cassette.call(PAGE, url, lambda: _load_job_page(url)))
+
+
+def fetch_job_page(url):
+    # Sessions pasting the same posting at once share one download and clean
+    return get_single_flight().do(flight_key("page", normalize_url(url)), lambda: _fetch_job_page(url))
+
+
+def load_jobs(chain, job_input, input_method, report=None):
+    return list(stream_jobs(chain, job_input, input_method, report))
+
+
+def stream_jobs(chain, job_input, input_method, report=None):
+    # `report` is filled in by crawls; see crawler.crawl_jobs
+    if input_method == "text":
+        yield chain.parse_job_description(job_input)
+    elif input_method == "crawl":
+        from crawler import crawl_jobs
+        yield from crawl_jobs(chain, job_input, report=report)
+    else:
+        yield from chain.stream_jobs(fetch_job_page(job_input))
+
+
+def job_skills_for(job, resume_info):
+    return job.skills + resume_info.skills
+
+
+def jobs_prompt_version(input_method):
+    # Pasted text goes through the parse prompt, pages through the extract prompt
+    return PROMPT_VERSIONS["parse_job" if input_method == "text" else "extract_jobs"]
+
+
+def _cached_stage(result_store, stage, input_hash, version, compute, decode):
+    if result_store is None:
+        return compute()
+    value = result_store.get_stage(stage, input_hash, version)
+    if value is not None:
+        return decode(value)
+
+    # A miss that is already being computed elsewhere waits for that result
+    def compute_and_store():
+        value = compute()
+        result_store.put_stage(stage, input_hash, version, value)
+        return value
+    return get_single_flight().do(flight_key("stage", stage, input_hash, version), compute_and_store)
+
+
+def load_resume_text(resume_bytes, file_type, result_store=None):
+    return _cached_stage(result_store, "document", content_hash(resume_bytes), DOCUMENT_VERSION,
+                         lambda: extract_document(resume_bytes, file_type), str)
+
+
+def fallback_resume_info(resume_text):
+    # Resume details without the LLM: contact info, the first line as the name,
+    # a "Skills:" line if there is one, and the text itself as the summary
+    contact = extract_contact_info(resume_text)
+    lines = [line.strip() for line in resume_text.splitlines() if line.strip()]
+    name = lines[0].split(" - ")[0].strip() if lines else ""
+    if len(name) > 60:
+        name = ""
+    skills = re.search(r'skills?\s*[:\-]\s*([^\n.]+)', resume_text, re.IGNORECASE)
+    return ResumeInfo(
+        name=name,
+        email=contact["email"] or "",
+        phone=contact["phone"] or "",
+        skills=format_skills_list(skills.group(1)) if skills else [],
+        summary=clean_resume_text(resume_text)[:FALLBACK_SUMMARY_CHARS]
+    )
+
+
+def load_resume_info(chain, resume_text, result_store=None):
+    if degraded():
+        # Under load a resume the store has not seen skips the LLM; the fallback
+        # is not stored, so the next normal run still extracts it properly
+        stored = None
+        if result_store is not None:
+            stored = result_store.get_stage("resume", content_hash(resume_text), PROMPT_VERSIONS["resume"])
+        return fallback_resume_info(resume_text) if stored is None else ResumeInfo.from_dict(stored)
+    return _cached_stage(result_store, "resume", content_hash(resume_text), PROMPT_VERSIONS["resume"],
+                         lambda: chain.extract_resume_info(resume_text), ResumeInfo.from_dict)
+
+
+def cached_jobs(result_store, job_input, input_method):
+    if result_store is None:
+        return None
+    jobs = result_store.get_stage(f"jobs:{input_method}", content_hash(job_input),
+                                  jobs_prompt_version(input_method), JOBS_TTL_SECONDS.get(input_method))
+    return None if jobs is None else [Job.from_dict(job) for job in jobs]
+
+
+def store_jobs(result_store, job_input, input_method, jobs, report=None):
+    # No jobs, or a crawl with pages that failed extraction, may be a passing
+    # LLM failure rather than what the site holds, so it is not cached
+    if not jobs or (report and report.get("failed")):
+        return
+    if result_store is not None:
+        result_store.put_stage(f"jobs:{input_method}", content_hash(job_input),
+                               jobs_prompt_version(input_method), jobs)
+
+
+def prefetch_jobs(chain, job_input, input_method, result_store, cancelled=lambda: False):
+    # Same extraction as the pipeline, checking `cancelled` between steps so a
+    # stale prefetch stops (and closes the LLM stream) once the input changes
+    if cached_jobs(result_store, job_input, input_method) is not None:
+        return
+    if input_method == "text":
+        store_jobs(result_store, job_input, input_method, [chain.parse_job_description(job_input)])
+        return
+    report = {}
+    if input_method == "url":
+        page_text = fetch_job_page(job_input)
+        if cancelled():
+            return
+        stream = chain.stream_jobs(page_text)
+    else:
+        stream = stream_jobs(chain, job_input, input_method, report)
+    jobs = []
+    try:
+        for job in stream:
+            if cancelled():
+                return
+            jobs.append(job)
+    finally:
+        stream.close()
+    store_jobs(result_store, job_input, input_method, jobs, report)
+
+
+def write_email(chain, portfolio, result_store, resume_info, resume_hash, portfolio_version, job, retrieved, variants=1):
+    if degraded():
+        variants = 1
+    entry = {"job": job, "cached": False, "previous": None, "duplicate_of": None, "variants": []}
+    job_hash = content_hash(job)
+    key = None
+    if result_store is not None:
+        key = result_store.email_key(resume_hash, job_hash, portfolio_version, PROMPT_VERSIONS["email"])
+        # Asking for several variants means the user wants fresh choices
+        stored = result_store.get_email(key) if variants == 1 else None
+        if stored is not None:
+            projects = [Project.from_dict(project) for project in stored["projects"]]
+            entry.update(email=stored["email"], projects=projects, cached=True)
+            return entry
+
+    relevant_projects = retrieved.get(job_hash)
+    if relevant_projects is None:
+        relevant_projects = portfolio.query_links(job_skills_for(job, resume_info), keyword_only=degraded())
+    if variants > 1:
+        ranked = rank_emails(chain.write_email_variants(job, resume_info, relevant_projects, variants),
+                             job, relevant_projects)
+        email = ranked[0]["email"]
+        entry["variants"] = ranked
+    else:
+        email = chain.write_candidate_email(job, resume_info, relevant_projects)
+    entry.update(email=email, projects=relevant_projects)
+    if result_store is not None:
+        entry["previous"] = result_store.previous_email(resume_hash, job_hash, key)
+        # A degraded email is not cached, so it does not outlive the load spike
+        if not degraded():
+            result_store.put_email(key, resume_hash, job_hash, portfolio_version, PROMPT_VERSIONS["email"],
+                                   job, email, relevant_projects)
+    return entry
+
+
+def iter_pipeline(chain, portfolio, resume_text, job_input, input_method, result_store=None, variants=1):
+    # Yields (event, value) pairs as each step finishes so callers can stream results.
+    # With a result store, unchanged steps and emails are served from it.
+    resume_hash = content_hash(resume_text)
+
+    yield "stage", "resume"
+    resume_info = load_resume_info(chain, resume_text, result_store)
+    yield "resume_info", resume_info
+
+    yield "stage", "portfolio"
+    portfolio.load_portfolio()
+    portfolio_version = portfolio.store.content_hash()
+
+    # Jobs stream in as the LLM closes each JSON object; retrieval for a job
+    # starts right away instead of waiting for the whole extraction
+    yield "stage", "job"
+    jobs = cached_jobs(result_store, job_input, input_method)
+    retrieved = {}
+    if jobs is None:
+        jobs = []
+        report = {}
+        for job in stream_jobs(chain, job_input, input_method, report):
+            jobs.append(job)
+            retrieved[content_hash(job)] = portfolio.query_links(job_skills_for(job, resume_info), keyword_only=degraded())
+            yield "job", job
+        store_jobs(result_store, job_input, input_method, jobs, report)
+    yield "jobs", jobs
+
+    # Near-duplicate postings (same role in several locations) are grouped
+    # before ranking, so copies of one role cannot fill the top-K; only the
+    # representatives are ranked and each group shares one generation
+    groups = find_duplicate_groups(jobs)
+
+    # Only postings that match the resume well enough get an email
+    embed = None if degraded() else getattr(portfolio.vector_store, "embedding_function", None)
+    ranking = []
+    for match in rank_jobs([jobs[representative] for representative, _ in groups], resume_info, embed):
+        representative, duplicates = groups[match["index"]]
+        ranking.append(dict(match, index=representative, duplicate_of=None))
+        ranking.extend(dict(match, index=duplicate, role=jobs[duplicate].role, duplicate_of=representative)
+                       for duplicate in duplicates)
+    yield "ranking", ranking
+    matches = {match["index"]: match for match in ranking}
+
+    for representative, duplicates in groups:
+        if not matches[representative]["selected"]:
+            continue
+        yield "stage", "email"
+        job = jobs[representative]
+        entry = write_email(chain, portfolio, result_store, resume_info, resume_hash, portfolio_version,
+                            job, retrieved, variants)
+        entry["index"] = representative
+        entry["match"] = matches[representative]
+        yield "email", entry
+
+        for duplicate in duplicates:
+            yield "stage", "email"
+            yield "email", dict(
+                entry,
+                index=duplicate,
+                job=jobs[duplicate],
+                email=tailor_email(entry["email"], job, jobs[duplicate]),
+                variants=[dict(variant, email=tailor_email(variant["email"], job, jobs[duplicate]))
+                          for variant in entry["variants"]],
+                previous=None,
+                duplicate_of=representative,
+                match=matches[duplicate]
+            )
+
+    yield "stage", "done"
+
+
+# resume -> jobs -> retrieval -> email; `progress(stage, fraction)` is called between steps
+def run_pipeline(chain, portfolio, resume_bytes, file_type, job_input, input_method, progress=None, result_store=None,
+                 variants=1):
+    result = {"resume_info": None, "jobs": [], "ranking": [], "emails": [], "mode": current_mode()}
+    start, end = STAGES["email"][1], STAGES["done"][1]
+
+    resume_text = load_resume_text(resume_bytes, file_type, result_store)
+    for event, value in iter_pipeline(chain, portfolio, resume_text, job_input, input_method, result_store, variants):
+        if event == "stage":
+            if progress is None:
+                continue
+            if value == "email":
+                done = len(result["emails"])
+                selected = sum(match["selected"] for match in result["ranking"])
+                progress(value, start + (end - start) * done / max(selected, 1))
+            else:
+                progress(value, STAGES[value][1])
+        elif event == "email":
+            value.pop("index")
+            result["emails"].append(value)
+        elif event != "job":
+            result[event] = value
+
+    return result
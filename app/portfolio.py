@@ -1,173 +1,214 @@
-import pandas as pd
-import chromadb
-import uuid
 import os
 import tempfile
+import uuid
 import streamlit as st
-from chromadb.config import Settings
+
+from project_store import ProjectStore
+from vector_store import get_shared_store
 
 
 class Portfolio:
-    def __init__(self, file_path=None, csv_data=None):
+    def __init__(self, file_path=None, csv_data=None, tenant_id=None, vector_store=None):
         self.file_path = file_path
         self.csv_data = csv_data
-        self.data = None
-        
+        self.store = ProjectStore()
+
         # Create a temporary directory for ChromaDB that works on Render
         self.temp_dir = tempfile.mkdtemp()
-        
-        try:
-            # Use in-memory client for cloud deployments
-            self.chroma_client = chromadb.EphemeralClient()
-            self.collection = self.chroma_client.get_or_create_collection(name="personal_projects")
-        except Exception as e:
-            st.error(f"ChromaDB initialization failed: {e}")
-            # Fallback to simple in-memory storage
-            self.collection = None
-            self.projects_cache = []
-        
+
+        # Each portfolio is a tenant of the process-wide vector store, which is
+        # resolved on first use so building a Portfolio never imports ChromaDB
+        self.tenant_id = tenant_id or uuid.uuid4().hex
+        # Vector-store tenant holding the current index; a CSV upload indexes
+        # into a fresh one and only replaces this once it fully succeeds
+        self._index_id = self.tenant_id
+        self._vector_store = vector_store
+        self._vector_store_resolved = vector_store is not None
+
         if csv_data is not None:
-            self.data = csv_data
+            self.store = self._to_store(csv_data)
         elif file_path and os.path.exists(file_path):
             try:
-                self.data = pd.read_csv(file_path)
+                import pandas as pd
+                self.store = ProjectStore.from_dataframe(
+                    pd.read_csv(file_path, dtype=str, keep_default_na=False)
+                )
             except Exception as e:
                 st.error(f"Error reading CSV file: {e}")
-                self.data = pd.DataFrame(columns=['Project_Name', 'Description', 'Tech_Stack', 'Links', 'GitHub', 'Demo_Link'])
-        else:
-            self.data = pd.DataFrame(columns=['Project_Name', 'Description', 'Tech_Stack', 'Links', 'GitHub', 'Demo_Link'])
+
+    @property
+    def vector_store(self):
+        if not self._vector_store_resolved:
+            self._vector_store_resolved = True
+            try:
+                self._vector_store = get_shared_store()
+            except Exception as e:
+                st.error(f"ChromaDB initialization failed: {e}")
+                # Fallback to keyword matching over the project store
+                self._vector_store = None
+        return self._vector_store
+
+    @vector_store.setter
+    def vector_store(self, value):
+        self._vector_store = value
+        self._vector_store_resolved = True
+
+    @staticmethod
+    def _to_store(data):
+        if isinstance(data, ProjectStore):
+            return data
+        return ProjectStore.from_dataframe(data)
+
+    def _batch_size(self):
+        try:
+            return min(self.vector_store.max_batch_size(), 1024)
+        except Exception:
+            return 256
+
+    def _get_collection(self):
+        collection, created = self.vector_store.get_collection(self._index_id)
+        if created and len(self.store):
+            # The tenant was evicted while idle, rebuild its index from the store
+            self._index_rows(collection, 0, len(self.store))
+        return collection
+
+    def _reset_collection(self):
+        return self.vector_store.reset_collection(self._index_id)
+
+    def _precomputed_embeddings(self, documents):
+        # Bundled sample projects ship with build-time embeddings; skip the model for them
+        model_name = getattr(self.vector_store.embedding_function, "model_name", None)
+        if model_name is None:
+            return None
+        from sample_embeddings import get_sample_embeddings
+        precomputed = get_sample_embeddings()
+        return precomputed.lookup(documents, model_name) if precomputed is not None else None
+
+    def _index_rows(self, collection, start, stop, store=None, index_id=None):
+        # Metadata only carries the row index; project fields live in the store
+        store = self.store if store is None else store
+        index_id = index_id or self._index_id
+        batch_size = self._batch_size()
+        for batch_start in range(start, stop, batch_size):
+            batch_stop = min(batch_start + batch_size, stop)
+            documents = store.documents(batch_start, batch_stop)
+            embeddings = self._precomputed_embeddings(documents)
+            collection.add(
+                documents=documents,
+                metadatas=[{"row": row} for row in range(batch_start, batch_stop)],
+                ids=[str(row) for row in range(batch_start, batch_stop)],
+                **({} if embeddings is None else {"embeddings": embeddings})
+            )
+            self.vector_store.record_rows(index_id, documents)
 
     def load_portfolio(self, force_reload=False):
-        if self.data is None or len(self.data) == 0:
+        if len(self.store) == 0:
             return False
-        
+
         try:
-            if self.collection is not None:
+            if self.vector_store is not None:
                 # Use ChromaDB if available
                 if force_reload:
-                    try:
-                        self.chroma_client.delete_collection(name="personal_projects")
-                    except:
-                        pass
-                    self.collection = self.chroma_client.get_or_create_collection(name="personal_projects")
-                
-                if not self.collection.count() or force_reload:
-                    for idx, row in self.data.iterrows():
-                        project_text = f"{row.get('Project_Name', '')} {row.get('Description', '')} {row.get('Tech_Stack', '')}"
-                        
-                        self.collection.add(
-                            documents=project_text,
-                            metadatas={
-                                "project_name": str(row.get("Project_Name", "")),
-                                "description": str(row.get("Description", "")),
-                                "tech_stack": str(row.get("Tech_Stack", "")),
-                                "links": str(row.get("Links", "")),
-                                "github": str(row.get("GitHub", "")),
-                                "demo": str(row.get("Demo_Link", ""))
-                            },
-                            ids=[str(uuid.uuid4())]
-                        )
-            else:
-                # Fallback to simple caching
-                self.projects_cache = []
-                for _, row in self.data.iterrows():
-                    project_info = {
-                        'name': str(row.get('Project_Name', 'Unknown Project')),
-                        'description': str(row.get('Description', '')),
-                        'tech_stack': str(row.get('Tech_Stack', '')),
-                        'links': str(row.get('Links', '')),
-                        'github': str(row.get('GitHub', '')),
-                        'demo': str(row.get('Demo_Link', ''))
-                    }
-                    self.projects_cache.append(project_info)
-            
+                    collection = self._reset_collection()
+                else:
+                    collection = self._get_collection()
+
+                if not collection.count() or force_reload:
+                    self._index_rows(collection, 0, len(self.store))
+
             return True
-            
+
         except Exception as e:
             st.error(f"Error loading portfolio: {e}")
             return False
 
-    def query_links(self, skills):
+    def query_links(self, skills, keyword_only=False):
+        # `keyword_only` skips the embedding query, e.g. when the service is shedding load
         if not skills:
             return []
-        
+
         try:
-            if self.collection is not None:
+            if self.vector_store is not None and not keyword_only:
                 # Use ChromaDB query
                 if isinstance(skills, list):
                     query_text = " ".join(str(skill) for skill in skills)
                 else:
                     query_text = str(skills)
-                
-                results = self.collection.query(query_texts=[query_text], n_results=3)
-                
+
+                results = self._get_collection().query(query_texts=[query_text], n_results=3)
+
                 formatted_projects = []
                 metadatas = results.get('metadatas', [])
-                
+
                 for metadata_list in metadatas:
                     for metadata in metadata_list:
-                        project_info = {
-                            'name': metadata.get('project_name', 'Unknown Project'),
-                            'description': metadata.get('description', ''),
-                            'tech_stack': metadata.get('tech_stack', ''),
-                            'links': metadata.get('links', ''),
-                            'github': metadata.get('github', ''),
-                            'demo': metadata.get('demo', '')
-                        }
-                        formatted_projects.append(project_info)
-                
+                        row = metadata.get('row')
+                        if row is not None and row < len(self.store):
+                            formatted_projects.append(self.store[row].to_project())
+
                 return formatted_projects
             else:
-                # Fallback to simple matching
-                if isinstance(skills, list):
-                    skills_lower = [str(skill).lower() for skill in skills]
-                else:
-                    skills_lower = [str(skills).lower()]
-                
-                matched_projects = []
-                for project in self.projects_cache:
-                    tech_stack_lower = project['tech_stack'].lower()
-                    description_lower = project['description'].lower()
-                    
-                    # Simple keyword matching
-                    match_score = 0
-                    for skill in skills_lower:
-                        if skill in tech_stack_lower or skill in description_lower:
-                            match_score += 1
-                    
-                    if match_score > 0:
-                        matched_projects.append((project, match_score))
-                
-                # Sort by match score and return top 3
-                matched_projects.sort(key=lambda x: x[1], reverse=True)
-                return [project for project, _ in matched_projects[:3]]
-                
+                # Fallback to simple keyword matching
+                if not isinstance(skills, list):
+                    skills = [skills]
+
+                scores = self.store.keyword_scores(skills)
+                ranked = sorted(
+                    (row for row, score in enumerate(scores) if score > 0),
+                    key=lambda row: scores[row],
+                    reverse=True
+                )
+                return [self.store[row].to_project() for row in ranked[:3]]
+
         except Exception as e:
             st.error(f"Error querying projects: {e}")
             return []
 
     def update_data(self, new_data):
         try:
-            self.data = new_data
+            self.store = self._to_store(new_data)
             return self.load_portfolio(force_reload=True)
         except Exception as e:
             st.error(f"Error updating data: {e}")
             return False
-    
-    def get_projects_count(self):
-        try:
-            return len(self.data) if self.data is not None else 0
-        except:
-            return 0
-    
-    def get_project_names(self):
+
+    def ingest_chunks(self, chunks, progress_callback=None):
+        # Streams (DataFrame chunk, fraction) pairs into a new store and index,
+        # so only one chunk of the uploaded CSV is held as a DataFrame at a time.
+        # The loaded portfolio stays in place until the whole upload succeeds.
+        vector_store = self.vector_store
+        store = ProjectStore()
+        index_id = f"{self.tenant_id}:{uuid.uuid4().hex}"
         try:
-            if self.data is not None and not self.data.empty:
-                return self.data['Project_Name'].tolist()
-            return []
+            collection = vector_store.reset_collection(index_id) if vector_store is not None else None
+
+            for chunk, fraction in chunks:
+                start = len(store)
+                store.extend({col: chunk[col].tolist() for col in chunk.columns})
+                if collection is not None and len(store) > start:
+                    self._index_rows(collection, start, len(store), store, index_id)
+                if progress_callback is not None:
+                    progress_callback(len(store), fraction)
+
+            if len(store) == 0:
+                raise ValueError("CSV file is empty")
+
         except Exception as e:
-            st.error(f"Error getting project names: {e}")
-            return []
+            if vector_store is not None:
+                vector_store.evict(index_id)
+            return False, str(e)
+
+        previous_index_id = self._index_id
+        self.store, self._index_id = store, index_id
+        if vector_store is not None:
+            vector_store.evict(previous_index_id)
+        return True, f"Successfully processed {len(store)} projects"
+
+    def get_projects_count(self):
+        return len(self.store)
+
+    def get_project_names(self):
+        return self.store.names()
 
     def __del__(self):
         # Cleanup temporary directory
@@ -176,4 +217,4 @@ class Portfolio:
             if hasattr(self, 'temp_dir') and os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
         except:
-            pass
\ No newline at end of file
+            pass
@@ -0,0 +1,139 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from admission import NORMAL, get_admission
+from ledger import usage_scope
+from pipeline import load_resume_info, load_resume_text, prefetch_jobs
+from result_store import content_hash, get_result_store
+
+
+RESUME = "resume"
+JOBS = "jobs"
+
+
+class PrefetchTask:
+    __slots__ = ("key", "future", "cancelled")
+
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+        self.future.cancel()
+
+
+# Runs the input-only pipeline steps (resume text and extraction, job fetch and
+# parsing) while the user is still filling in the form. Results land in the
+# result store, so pressing Generate only leaves retrieval and email writing.
+# Each session keeps at most one task per input; a new input cancels the old one.
+# Finished tasks are kept so reruns with the same input do not start it again,
+# up to `max_tasks`; past that the least recently used finished ones are dropped.
+class Prefetcher:
+    def __init__(self, chain, result_store, workers=2, admission=None, max_tasks=1024):
+        self.chain = chain
+        self.admission = admission or get_admission()
+        self.result_store = result_store
+        self.max_tasks = max_tasks
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._tasks = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"started": 0, "cancelled": 0, "failed": 0, "shed": 0}
+
+    def _start(self, session, kind, key, work):
+        # Speculative work is the first to go under load
+        if self.admission.level() != NORMAL:
+            with self._lock:
+                self._counts["shed"] += 1
+            return None
+        with self._lock:
+            current = self._tasks.get((session, kind))
+            if current is not None:
+                if current.key == key:
+                    self._tasks.move_to_end((session, kind))
+                    return current.future
+                current.cancel()
+                self._counts["cancelled"] += 1
+            task = PrefetchTask(key)
+            task.future = self._executor.submit(self._run, session, task, work)
+            self._tasks[(session, kind)] = task
+            self._tasks.move_to_end((session, kind))
+            self._counts["started"] += 1
+            self._prune()
+            return task.future
+
+    def _prune(self):
+        # Running tasks stay reachable for cancel() and wait()
+        excess = len(self._tasks) - self.max_tasks
+        if excess > 0:
+            for task_key in [key for key, task in self._tasks.items() if task.future.done()][:excess]:
+                del self._tasks[task_key]
+
+    def _run(self, session, task, work):
+        if task.cancelled.is_set():
+            return
+        try:
+            with usage_scope(session=session):
+                work(task.cancelled.is_set)
+        except Exception:
+            # Best effort: the pipeline repeats the step and reports the error
+            with self._lock:
+                self._counts["failed"] += 1
+
+    def prefetch_resume(self, session, resume_bytes, file_type):
+        def work(cancelled):
+            resume_text = load_resume_text(resume_bytes, file_type, self.result_store)
+            if not cancelled():
+                load_resume_info(self.chain, resume_text, self.result_store)
+
+        return self._start(session, RESUME, (content_hash(resume_bytes), file_type), work)
+
+    def prefetch_jobs(self, session, job_input, input_method):
+        def work(cancelled):
+            prefetch_jobs(self.chain, job_input, input_method, self.result_store, cancelled)
+
+        return self._start(session, JOBS, (content_hash(job_input), input_method), work)
+
+    def cancel(self, session, kind=None):
+        with self._lock:
+            for task_key in [key for key in self._tasks if key[0] == session and kind in (None, key[1])]:
+                self._tasks.pop(task_key).cancel()
+                self._counts["cancelled"] += 1
+
+    def wait(self, session, timeout=None):
+        # Called before generation so it reuses an in-flight prefetch instead of
+        # repeating the same LLM call
+        with self._lock:
+            futures = [task.future for key, task in self._tasks.items() if key[0] == session]
+        wait(futures, timeout=timeout)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts, pending=sum(not task.future.done() for task in self._tasks.values()))
+
+    def shutdown(self):
+        with self._lock:
+            for task in self._tasks.values():
+                task.cancel()
+            self._tasks.clear()
+        self._executor.shutdown(wait=False)
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher(chain):
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(
+                chain,
+                get_result_store(),
+                workers=int(os.getenv("PREFETCH_WORKERS", "2")),
+                max_tasks=int(os.getenv("PREFETCH_MAX_TASKS", "1024"))
+            )
+        return _prefetcher
@@ -0,0 +1,223 @@
+import hashlib
+import re
+
+
+CSV_COLUMNS = ['Project_Name', 'Description', 'Tech_Stack', 'Links', 'GitHub', 'Demo_Link']
+FIELDS = ('name', 'description', 'tech_stack', 'links', 'github', 'demo')
+COLUMN_TO_FIELD = dict(zip(CSV_COLUMNS, FIELDS))
+
+_TOKEN_SPLIT = re.compile(r'\s*[,;|/\n]\s*')
+
+
+def _clean(value):
+    # NaN is the only value that is not equal to itself
+    if value is None or value != value:
+        return ""
+    return str(value).strip()
+
+
+class ProjectRecord:
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def name(self):
+        return self._store.columns['name'][self._index] or 'Unknown Project'
+
+    @property
+    def description(self):
+        return self._store.columns['description'][self._index]
+
+    @property
+    def tech_stack(self):
+        return self._store.columns['tech_stack'][self._index]
+
+    @property
+    def links(self):
+        return self._store.columns['links'][self._index]
+
+    @property
+    def github(self):
+        return self._store.columns['github'][self._index]
+
+    @property
+    def demo(self):
+        return self._store.columns['demo'][self._index]
+
+    @property
+    def tech_tokens(self):
+        return self._store.tech_tokens[self._index]
+
+    def to_project(self):
+        from models import Project
+        return Project(self.name, self.description, self.tech_stack, self.links, self.github, self.demo)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'description': self.description,
+            'tech_stack': self.tech_stack,
+            'links': self.links,
+            'github': self.github,
+            'demo': self.demo
+        }
+
+    def __repr__(self):
+        return f"ProjectRecord({self._index}, {self.name!r})"
+
+
+# Column-oriented storage: one list per field plus interned tech-stack tokens,
+# so a portfolio is held once instead of as a DataFrame, dicts and Chroma metadata.
+class ProjectStore:
+    def __init__(self):
+        self.columns = {field: [] for field in FIELDS}
+        self.tech_tokens = []
+        self._token_table = {}
+        self._content_hash = None
+
+    def __len__(self):
+        return len(self.columns['name'])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ProjectRecord(self, index)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("project index out of range")
+        return ProjectRecord(self, index)
+
+    def _intern_tokens(self, tech_stack):
+        table = self._token_table
+        tokens = []
+        for token in _TOKEN_SPLIT.split(tech_stack.lower()):
+            if token:
+                tokens.append(table.setdefault(token, token))
+        return tuple(tokens)
+
+    def append(self, name="", description="", tech_stack="", links="", github="", demo=""):
+        self._content_hash = None
+        values = (name, description, tech_stack, links, github, demo)
+        for field, value in zip(FIELDS, values):
+            self.columns[field].append(_clean(value))
+        self.tech_tokens.append(self._intern_tokens(self.columns['tech_stack'][-1]))
+
+    def extend(self, columns):
+        # `columns` maps CSV column names (or field names) to equally sized sequences.
+        # Every column is checked before any is extended, so a bad call leaves
+        # the store as it was.
+        cleaned = {}
+        for key, values in columns.items():
+            field = COLUMN_TO_FIELD.get(key, key)
+            if field in self.columns:
+                cleaned[field] = [_clean(value) for value in values]
+        if len({len(values) for values in cleaned.values()}) > 1:
+            raise ValueError("all project columns must have the same length")
+        if not cleaned:
+            return 0
+        length = len(next(iter(cleaned.values())))
+        self._content_hash = None
+        for field, values in cleaned.items():
+            self.columns[field].extend(values)
+        for field, column in self.columns.items():
+            if len(column) < len(self.tech_tokens) + length:
+                column.extend([""] * (len(self.tech_tokens) + length - len(column)))
+        self.tech_tokens.extend(
+            self._intern_tokens(tech_stack) for tech_stack in self.columns['tech_stack'][-length:]
+        )
+        return length
+
+    def document(self, index):
+        columns = self.columns
+        return f"{columns['name'][index]} {columns['description'][index]} {columns['tech_stack'][index]}"
+
+    def documents(self, start=0, stop=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [self.document(index) for index in range(start, stop)]
+
+    def content_hash(self):
+        # Portfolio version used to key stored results; recomputed only after a mutation
+        if self._content_hash is None:
+            digest = hashlib.sha256()
+            for field in FIELDS:
+                for value in self.columns[field]:
+                    digest.update(value.encode("utf-8"))
+                    digest.update(b"\x1f")
+                digest.update(b"\x1e")
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def names(self):
+        return list(self.columns['name'])
+
+    def keyword_scores(self, skills):
+        skills_lower = [str(skill).lower() for skill in skills if str(skill).strip()]
+        descriptions = self.columns['description']
+        tech_stacks = self.columns['tech_stack']
+        scores = []
+        for index in range(len(self)):
+            haystack = f"{tech_stacks[index]} {descriptions[index]}".lower()
+            scores.append(sum(1 for skill in skills_lower if skill in haystack))
+        return scores
+
+    @classmethod
+    def from_dataframe(cls, df):
+        store = cls()
+        store.extend({col: df[col].tolist() for col in CSV_COLUMNS if col in df.columns})
+        return store
+
+    @classmethod
+    def from_records(cls, records):
+        store = cls()
+        for record in records:
+            store.append(*(record.get(col, record.get(field, "")) for col, field in COLUMN_TO_FIELD.items()))
+        return store
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame({col: self.columns[field] for col, field in COLUMN_TO_FIELD.items()})
+
+    def to_arrow(self):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("pyarrow is required for Arrow/Parquet export. Install it with `pip install pyarrow`.")
+        arrays = {}
+        for col, field in COLUMN_TO_FIELD.items():
+            array = pa.array(self.columns[field], type=pa.string())
+            # tech stacks repeat heavily across projects, dictionary encoding keeps them small
+            arrays[col] = array.dictionary_encode() if field == 'tech_stack' else array
+        return pa.table(arrays)
+
+    @classmethod
+    def from_arrow(cls, table):
+        store = cls()
+        store.extend({
+            col: table.column(col).cast('string').to_pylist()
+            for col in CSV_COLUMNS if col in table.column_names
+        })
+        return store
+
+    def write_parquet(self, path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required for Arrow/Parquet export. Install it with `pip install pyarrow`.")
+        pq.write_table(self.to_arrow(), path)
+
+    @classmethod
+    def read_parquet(cls, path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required for Arrow/Parquet import. Install it with `pip install pyarrow`.")
+        return cls.from_arrow(pq.read_table(path))
@@ -0,0 +1,325 @@
+import argparse
+import base64
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from result_store import content_hash
+
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+# Replay what is on disk, record what is not
+AUTO = "auto"
+
+LLM = "llm"
+HTTP = "http"
+PAGE = "page"
+
+
+class ReplayMiss(KeyError):
+    pass
+
+
+# Request/response pairs on disk, one JSON line per recorded call, keyed by a
+# hash of the normalized request. A key recorded several times (e.g. sampled
+# email variants) replays its responses in turn. Replays sleep for the recorded
+# latency times `latency_scale`, so 0 replays as fast as possible.
+class Cassette:
+    def __init__(self, path, mode=REPLAY, latency_scale=1.0):
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._entries = {}
+        self._cursor = {}
+        self._lock = threading.Lock()
+        self.stats = {"replayed": 0, "recorded": 0, "missed": 0}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault((entry["kind"], entry["key"]), []).append(entry)
+
+    @property
+    def recording(self):
+        return self.mode in (RECORD, AUTO)
+
+    def lookup(self, kind, key):
+        if self.mode == RECORD:
+            return None
+        with self._lock:
+            entries = self._entries.get((kind, key))
+            if not entries:
+                self.stats["missed"] += 1
+                if self.mode == REPLAY:
+                    raise ReplayMiss(f"No recorded {kind} response for {key}")
+                return None
+            index = self._cursor.get((kind, key), 0)
+            self._cursor[(kind, key)] = index + 1
+            self.stats["replayed"] += 1
+            return entries[index % len(entries)]
+
+    def record(self, kind, key, entry):
+        entry = dict(entry, kind=kind, key=key)
+        with self._lock:
+            self._entries.setdefault((kind, key), []).append(entry)
+            self.stats["recorded"] += 1
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def wait(self, seconds):
+        if self.latency_scale and seconds > 0:
+            time.sleep(seconds * self.latency_scale)
+
+    def call(self, kind, key, compute):
+        # For calls whose result is plain JSON, such as a fetched page's text
+        entry = self.lookup(kind, key)
+        if entry is not None:
+            self.wait(entry["latency"])
+            return entry["value"]
+        started = time.perf_counter()
+        value = compute()
+        self.record(kind, key, {"value": value, "latency": time.perf_counter() - started})
+        return value
+
+
+def _llm_key(messages, kwargs):
+    # Only what changes the answer: the prompt and the call-time options
+    # (bound temperature, JSON mode)
+    return content_hash({
+        "messages": [[message.type, message.content] for message in messages],
+        "options": {name: kwargs[name] for name in sorted(kwargs) if name not in ("run_manager", "stop")}
+    })
+
+
+# Stand-in for the Chain's chat model: answers from the cassette, and in record
+# or auto mode asks `inner` (the real ChatGroq) and writes the exchange down.
+# Streams keep their chunk timing; usage metadata is kept for the ledger.
+class RecordReplayChatModel(BaseChatModel):
+    cassette: Any
+    inner: Optional[Any] = None
+    model_name: str = "replay"
+
+    @property
+    def _llm_type(self):
+        return "record-replay"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        key = _llm_key(messages, kwargs)
+        entry = self.cassette.lookup(LLM, key)
+        if entry is None:
+            started = time.perf_counter()
+            message = self.inner.invoke(messages, stop=stop, **kwargs)
+            entry = {
+                "content": message.content,
+                "usage": getattr(message, "usage_metadata", None),
+                "latency": time.perf_counter() - started
+            }
+            self.cassette.record(LLM, key, entry)
+        else:
+            self.cassette.wait(entry["latency"])
+        message = AIMessage(content=entry["content"], usage_metadata=entry["usage"] or None)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        key = _llm_key(messages, kwargs)
+        entry = self.cassette.lookup(LLM, key)
+        if entry is not None:
+            # Recorded as (seconds since the previous chunk, text) pairs
+            chunks = entry.get("chunks") or [[entry["latency"], entry["content"]]]
+            for index, (delay, text) in enumerate(chunks):
+                self.cassette.wait(delay)
+                usage = entry["usage"] if index == len(chunks) - 1 else None
+                yield ChatGenerationChunk(message=AIMessageChunk(content=text, usage_metadata=usage or None))
+            return
+
+        chunks = []
+        usage = None
+        content = []
+        started = last = time.perf_counter()
+        for chunk in self.inner.stream(messages, stop=stop, **kwargs):
+            now = time.perf_counter()
+            chunks.append([now - last, chunk.content])
+            last = now
+            content.append(chunk.content)
+            if getattr(chunk, "usage_metadata", None):
+                usage = chunk.usage_metadata
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk.content, usage_metadata=chunk.usage_metadata))
+        self.cassette.record(LLM, key, {
+            "content": "".join(content),
+            "chunks": chunks,
+            "usage": usage,
+            "latency": time.perf_counter() - started
+        })
+
+
+def _http_transport_class():
+    import httpx
+
+    # httpx transport for the crawler: responses are recorded with their
+    # status, content type, body and latency
+    class ReplayTransport(httpx.BaseTransport):
+        def __init__(self, cassette, inner=None):
+            self.cassette = cassette
+            self.inner = inner or httpx.HTTPTransport()
+
+        def handle_request(self, request):
+            key = f"{request.method} {request.url}"
+            entry = self.cassette.lookup(HTTP, key)
+            if entry is None:
+                started = time.perf_counter()
+                response = self.inner.handle_request(request)
+                try:
+                    body = response.read()
+                finally:
+                    response.close()
+                entry = {
+                    "status": response.status_code,
+                    "content_type": response.headers.get("content-type", ""),
+                    "body": base64.b64encode(body).decode("ascii"),
+                    "latency": time.perf_counter() - started
+                }
+                self.cassette.record(HTTP, key, entry)
+            else:
+                self.cassette.wait(entry["latency"])
+            return httpx.Response(
+                entry["status"],
+                headers={"content-type": entry["content_type"]},
+                content=base64.b64decode(entry["body"]),
+                request=request
+            )
+
+    return ReplayTransport
+
+
+def http_transport(cassette=None):
+    # None when record/replay is off, so httpx uses its default transport
+    cassette = cassette or get_cassette()
+    if cassette is None:
+        return None
+    return _http_transport_class()(cassette)
+
+
+def wrap_llm(make_llm, model_name, cassette=None):
+    # The Chain's default model, routed through the cassette when one is active.
+    # Pure replay never builds the real client, so it needs no API key.
+    cassette = cassette or get_cassette()
+    if cassette is None:
+        return make_llm()
+    inner = make_llm() if cassette.recording else None
+    return RecordReplayChatModel(cassette=cassette, inner=inner, model_name=model_name)
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    global _cassette
+    mode = os.getenv("REPLAY_MODE", OFF)
+    if mode == OFF:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(
+                os.getenv("REPLAY_PATH", "cassette.jsonl"),
+                mode=mode,
+                latency_scale=float(os.getenv("REPLAY_LATENCY_SCALE", "1"))
+            )
+        return _cassette
+
+
+SAMPLE_RESUME = (
+    "Jordan Lee - Software Engineer. jordan.lee@example.com. Skills: Python, React, PostgreSQL, Docker. "
+    "Experience: Software Engineer at Acme, 2 years, built APIs. Education: B.Tech in Computer Science."
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record the pipeline's LLM and page traffic once, then replay it at scale")
+    parser.add_argument("mode", choices=[RECORD, REPLAY, AUTO])
+    parser.add_argument("--cassette", default="cassette.jsonl")
+    parser.add_argument("--resume", help="Resume file (PDF, DOCX or TXT); a built-in sample by default")
+    parser.add_argument("--job-text")
+    parser.add_argument("--job-url")
+    parser.add_argument("--crawl", action="store_true")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--keyword-portfolio", action="store_true", help="Skip the embedding model")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile every run and print the top functions by cumulative time")
+    args = parser.parse_args()
+    if not args.job_text and not args.job_url:
+        parser.error("Provide --job-text or --job-url")
+
+    os.environ.update(REPLAY_MODE=args.mode, REPLAY_PATH=args.cassette, REPLAY_LATENCY_SCALE=str(args.latency_scale))
+    # Run as a script this file is __main__; Chain reads the cassette of the imported module
+    from replay import get_cassette
+    cassette = get_cassette()
+
+    from chains import Chain
+    from documents import TXT_TYPE, detect_type
+    from portfolio import Portfolio
+    from pipeline import run_pipeline
+
+    resume_bytes = SAMPLE_RESUME.encode("utf-8")
+    file_type = TXT_TYPE
+    if args.resume:
+        with open(args.resume, "rb") as f:
+            resume_bytes = f.read()
+        file_type = detect_type(file_name=args.resume)
+    job_input = args.job_text or args.job_url
+    input_method = "text" if args.job_text else ("crawl" if args.crawl else "url")
+
+    sample_csv = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resource", "personal_projects.csv")
+    portfolio = Portfolio(file_path=sample_csv, tenant_id="replay")
+    if args.keyword_portfolio:
+        portfolio.vector_store = None
+    chain = Chain()
+
+    profiles = []
+
+    def run(_):
+        # cProfile only sees its own thread, so each run gets a profiler
+        profiler = None
+        if args.profile:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        started = time.perf_counter()
+        result = run_pipeline(chain, portfolio, resume_bytes, file_type, job_input, input_method)
+        latency = time.perf_counter() - started
+        if profiler is not None:
+            profiler.disable()
+            profiles.append(profiler)
+        return latency, len(result["emails"])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(run, range(args.runs)))
+    elapsed = time.perf_counter() - started
+    if profiles:
+        import pstats
+        pstats.Stats(*profiles).sort_stats("cumulative").print_stats(25)
+
+    latencies = sorted(latency for latency, _ in results)
+    print(f"{args.runs} runs, {sum(emails for _, emails in results)} emails in {elapsed:.2f}s "
+          f"({args.runs / elapsed:.1f} runs/s)")
+    print(f"latency p50 {statistics.median(latencies) * 1000:.1f}ms  "
+          f"p95 {latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000:.1f}ms")
+    print(f"cassette: {cassette.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import difflib
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from models import json_default
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS emails (
+    key TEXT PRIMARY KEY,
+    resume_hash TEXT NOT NULL,
+    job_hash TEXT NOT NULL,
+    portfolio_version TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    job TEXT,
+    email TEXT NOT NULL,
+    projects TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS emails_job_hash ON emails (job_hash, created_at);
+CREATE INDEX IF NOT EXISTS emails_resume_job ON emails (resume_hash, job_hash, created_at);
+CREATE INDEX IF NOT EXISTS emails_created ON emails (created_at);
+CREATE TABLE IF NOT EXISTS stages (
+    stage TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (stage, input_hash, prompt_version)
+);
+CREATE INDEX IF NOT EXISTS stages_created ON stages (created_at);
+"""
+
+
+def content_hash(value):
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=json_default)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def email_diff(previous, current):
+    lines = difflib.unified_diff(
+        previous.splitlines(), current.splitlines(),
+        fromfile="previous", tofile="current", lineterm=""
+    )
+    return "\n".join(lines)
+
+
+# Persists generated emails keyed by (resume, job, portfolio version, prompt
+# version) plus the intermediate resume/job extractions, so unchanged inputs are
+# served from disk and only the entries whose inputs changed are regenerated.
+# Rows older than `retention_seconds` are deleted on startup and then at most
+# every `prune_interval` seconds as new rows are written.
+class ResultStore:
+    def __init__(self, db_path=None, retention_seconds=30 * 24 * 3600, prune_interval=3600):
+        self.db_path = db_path or os.path.join(tempfile.gettempdir(), "cold_email_results.sqlite3")
+        self.retention_seconds = retention_seconds
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._pruned_at = 0.0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self.prune()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def email_key(resume_hash, job_hash, portfolio_version, prompt_version):
+        return content_hash("|".join((resume_hash, job_hash, portfolio_version, prompt_version)))
+
+    def prune(self):
+        self._pruned_at = time.time()
+        if not self.retention_seconds:
+            return
+        cutoff = self._pruned_at - self.retention_seconds
+        conn = self._conn()
+        conn.execute("DELETE FROM emails WHERE created_at < ?", (cutoff,))
+        conn.execute("DELETE FROM stages WHERE created_at < ?", (cutoff,))
+
+    def _prune_if_due(self):
+        if time.time() - self._pruned_at >= self.prune_interval:
+            self.prune()
+
+    def get_stage(self, stage, input_hash, prompt_version, max_age=None):
+        # `max_age` (seconds) treats older entries as missing, for stages whose
+        # input can change behind the same key, like a job page's URL
+        query = "SELECT value FROM stages WHERE stage = ? AND input_hash = ? AND prompt_version = ?"
+        params = (stage, input_hash, prompt_version)
+        if max_age is not None:
+            query += " AND created_at >= ?"
+            params += (time.time() - max_age,)
+        row = self._conn().execute(query, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_stage(self, stage, input_hash, prompt_version, value):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO stages (stage, input_hash, prompt_version, value, created_at) VALUES (?, ?, ?, ?, ?)",
+            (stage, input_hash, prompt_version, json.dumps(value, default=json_default), time.time())
+        )
+        self._prune_if_due()
+
+    def get_email(self, key):
+        row = self._conn().execute("SELECT email, projects FROM emails WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {"email": row[0], "projects": json.loads(row[1]) if row[1] else []}
+
+    def previous_email(self, resume_hash, job_hash, exclude_key):
+        # Latest email written from the same resume for the same job under a
+        # different portfolio or prompt, used for the diff view. Other users'
+        # emails for the posting are never returned.
+        row = self._conn().execute(
+            "SELECT email FROM emails WHERE resume_hash = ? AND job_hash = ? AND key != ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (resume_hash, job_hash, exclude_key)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put_email(self, key, resume_hash, job_hash, portfolio_version, prompt_version, job, email, projects):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO emails (key, resume_hash, job_hash, portfolio_version, prompt_version, job, email, projects, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, resume_hash, job_hash, portfolio_version, prompt_version,
+             json.dumps(job, default=json_default), email, json.dumps(projects, default=json_default), time.time())
+        )
+        self._prune_if_due()
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            "emails": conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0],
+            "stages": conn.execute("SELECT COUNT(*) FROM stages").fetchone()[0]
+        }
+
+
+_result_store = None
+_result_store_lock = threading.Lock()
+
+
+def get_result_store():
+    global _result_store
+    with _result_store_lock:
+        if _result_store is None:
+            _result_store = ResultStore(
+                os.getenv("RESULT_DB_PATH"),
+                retention_seconds=float(os.getenv("RESULT_RETENTION_SECONDS", str(30 * 24 * 3600)))
+            )
+        return _result_store
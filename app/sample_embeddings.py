@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+
+RESOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resource")
+SAMPLE_CSV_PATH = os.path.join(RESOURCE_DIR, "personal_projects.csv")
+VECTORS_PATH = os.path.join(RESOURCE_DIR, "sample_embeddings.npy")
+META_PATH = os.path.join(RESOURCE_DIR, "sample_embeddings.json")
+
+
+def document_hash(document):
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+def content_hash(model_name, document_hashes):
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    for value in document_hashes:
+        digest.update(value.encode("ascii"))
+    return digest.hexdigest()
+
+
+# Embeddings of the bundled sample projects, computed at build time and
+# memory-mapped at startup. Rows are keyed by document hash, so any store whose
+# documents are all covered (the sample data or the bundled CSV) skips the model.
+class PrecomputedEmbeddings:
+    def __init__(self, vectors, document_hashes, model_name):
+        self.vectors = vectors
+        self.model_name = model_name
+        self._rows = {value: row for row, value in enumerate(document_hashes)}
+
+    @classmethod
+    def load(cls, vectors_path=VECTORS_PATH, meta_path=META_PATH):
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            vectors = np.load(vectors_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        hashes = meta.get("documents", [])
+        if vectors.shape != (len(hashes), meta.get("dim")) or meta.get("content_hash") != content_hash(meta.get("model", ""), hashes):
+            # Stale or partially written artifact; fall back to embedding
+            return None
+        return cls(vectors, hashes, meta["model"])
+
+    def lookup(self, documents, model_name):
+        if model_name != self.model_name:
+            return None
+        rows = [self._rows.get(document_hash(document)) for document in documents]
+        if None in rows:
+            return None
+        return np.asarray(self.vectors[rows], dtype=np.float32)
+
+    def __len__(self):
+        return len(self._rows)
+
+
+def build(documents, embed, model_name, vectors_path=VECTORS_PATH, meta_path=META_PATH):
+    documents = list(dict.fromkeys(documents))
+    vectors = np.asarray(embed(documents), dtype=np.float16)
+    hashes = [document_hash(document) for document in documents]
+    np.save(vectors_path, vectors)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "model": model_name,
+            "dtype": "float16",
+            "dim": int(vectors.shape[1]),
+            "content_hash": content_hash(model_name, hashes),
+            "documents": hashes
+        }, f, indent=1)
+    return vectors
+
+
+_sample_embeddings = None
+_sample_embeddings_loaded = False
+_sample_embeddings_lock = threading.Lock()
+
+
+def get_sample_embeddings():
+    global _sample_embeddings, _sample_embeddings_loaded
+    with _sample_embeddings_lock:
+        if not _sample_embeddings_loaded:
+            _sample_embeddings = PrecomputedEmbeddings.load()
+            _sample_embeddings_loaded = True
+        return _sample_embeddings
+
+
+if __name__ == "__main__":
+    # Build step: python app/sample_embeddings.py [extra.csv ...]
+    import pandas as pd
+    from embeddings import DEFAULT_MODEL_NAME, default_model_factory
+    from main import create_sample_portfolio_data
+    from project_store import ProjectStore
+
+    documents = create_sample_portfolio_data().documents()
+    for path in [SAMPLE_CSV_PATH] + sys.argv[1:]:
+        documents += ProjectStore.from_dataframe(pd.read_csv(path, dtype=str, keep_default_na=False)).documents()
+    model = default_model_factory()
+    vectors = build(documents, model, DEFAULT_MODEL_NAME)
+    print(f"Wrote {vectors.shape[0]} x {vectors.shape[1]} float16 embeddings to {VECTORS_PATH}")
@@ -0,0 +1,193 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import Future
+
+from admission import Overloaded
+from ledger import BudgetExceeded
+from result_store import content_hash
+
+
+def normalize_text(text):
+    # Inputs that differ only in whitespace are the same request
+    return " ".join(str(text).split())
+
+
+def flight_key(*parts):
+    return content_hash([normalize_text(part) if isinstance(part, str) else part for part in parts])
+
+
+class _Stream:
+    __slots__ = ("items", "done", "error", "cancelled", "consumers", "condition")
+
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self.cancelled = False
+        self.consumers = 0
+        self.condition = threading.Condition()
+
+
+# Process-wide request coalescing: while a call for a key is in flight, callers
+# with the same key wait for it and share its result (or its exception)
+# instead of repeating the fetch or LLM call. Nothing is kept once the call
+# finishes; the result store is the cache. A caller that waits longer than
+# `wait_seconds` for the shared call gives up on it and makes its own.
+# `private_errors` are refusals that belong to the caller that hit them (its
+# budget, its admission mode): they are not shared, waiters retry instead.
+class SingleFlight:
+    def __init__(self, wait_seconds=30.0, private_errors=()):
+        self.wait_seconds = wait_seconds
+        self.private_errors = tuple(private_errors)
+        self._calls = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0, "timeouts": 0, "retried": 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            try:
+                return future.result(timeout=self.wait_seconds)
+            except TimeoutError:
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                return fn()
+            except self.private_errors:
+                # The leader was refused for its own reasons; try again, as
+                # the leader of a new call if nobody else has started one
+                with self._lock:
+                    self.stats["retried"] += 1
+                    if self._calls.get(key) is future:
+                        del self._calls[key]
+                return self.do(key, fn)
+
+        try:
+            result = fn()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            if not future.done():
+                future.set_exception(RuntimeError("Coalesced call was interrupted"))
+
+    def stream(self, key, factory):
+        # Generator version. The first caller starts a worker thread that drains
+        # `factory()` into a shared buffer, so production does not wait on any
+        # one consumer; every caller reads the buffer at its own pace. The
+        # worker stops once all callers have closed their generators.
+        with self._lock:
+            self.stats["calls"] += 1
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._streams[key] = _Stream()
+                # The worker runs in the caller's context, so its calls are
+                # billed and admitted like the caller's own
+                context = contextvars.copy_context()
+                threading.Thread(target=context.run, args=(self._produce, key, flight, factory),
+                                 name="single-flight-stream", daemon=True).start()
+            else:
+                self.stats["coalesced"] += 1
+            flight.consumers += 1
+        return self._consume(key, flight, factory, leader)
+
+    def _produce(self, key, flight, factory):
+        stream = factory()
+        try:
+            for item in stream:
+                with flight.condition:
+                    if flight.cancelled:
+                        break
+                    flight.items.append(item)
+                    flight.condition.notify_all()
+        except Exception as e:
+            with flight.condition:
+                flight.error = e
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            with self._lock:
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+            with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    def _detach(self, key, flight):
+        # The last caller to leave an unfinished stream cancels it; it is
+        # unlisted first so later callers start a fresh one
+        with self._lock:
+            flight.consumers -= 1
+            if flight.consumers or flight.done:
+                return
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+        with flight.condition:
+            flight.cancelled = True
+
+    def _consume(self, key, flight, factory, leader):
+        index = 0
+        fallback = None
+        try:
+            while True:
+                with flight.condition:
+                    if index >= len(flight.items) and not flight.done:
+                        flight.condition.wait_for(lambda: index < len(flight.items) or flight.done,
+                                                  timeout=self.wait_seconds)
+                    if index < len(flight.items):
+                        item = flight.items[index]
+                    elif not leader and isinstance(flight.error, self.private_errors):
+                        # Refused for the session that started it; not ours to raise
+                        fallback = "retried"
+                        break
+                    elif flight.error is not None:
+                        raise flight.error
+                    elif flight.done:
+                        return
+                    else:
+                        fallback = "timeouts"
+                        break
+                index += 1
+                yield item
+        finally:
+            self._detach(key, flight)
+
+        # The shared call is stalled or was refused: finish on a call of this
+        # caller's own (or a new shared one), skipping the items already yielded
+        with self._lock:
+            self.stats[fallback] += 1
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+        seen = {content_hash(item) for item in flight.items[:index]}
+        rest = factory() if fallback == "timeouts" else self.stream(key, factory)
+        for item in rest:
+            if content_hash(item) not in seen:
+                yield item
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight(wait_seconds=float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "30")),
+                                          private_errors=(Overloaded, BudgetExceeded))
+        return _single_flight
@@ -0,0 +1,127 @@
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+
+# Modules the first page render never needs; importing them in the background
+# keeps them off the cold-start critical path.
+WARM_UP_MODULES = ["pandas", "chromadb", "langchain_groq", "langchain_core.output_parsers"]
+PROFILED_MODULES = [
+    "streamlit", "pandas", "chromadb", "langchain_groq", "langchain_core.prompts",
+    "langchain_community.document_loaders", "PyPDF2", "docx", "chains", "portfolio", "utils"
+]
+
+_warm_up_lock = threading.Lock()
+_warm_up_thread = None
+warm_up_report = {}
+
+
+def _warm_up_modules():
+    # The numpy vector backend never needs chromadb, so it is not imported either
+    if os.getenv("VECTOR_BACKEND", "chroma") == "numpy":
+        return [module for module in WARM_UP_MODULES if module != "chromadb"]
+    return WARM_UP_MODULES
+
+
+def _warm_up(sample_factory=None):
+    started = time.perf_counter()
+    for module in _warm_up_modules():
+        module_started = time.perf_counter()
+        try:
+            importlib.import_module(module)
+            warm_up_report[module] = round(time.perf_counter() - module_started, 3)
+        except Exception as e:
+            warm_up_report[module] = f"failed: {e}"
+
+    try:
+        from embeddings import get_embedding_service
+        from vector_store import get_shared_store
+
+        model_started = time.perf_counter()
+        get_shared_store()
+        service = get_embedding_service()
+        service.warm_up()
+        warm_up_report["embedding_model"] = round(time.perf_counter() - model_started, 3)
+
+        if sample_factory is not None:
+            # Map the build-time sample embeddings; if they are missing or stale,
+            # embedding the sample documents fills the shared cache instead, so
+            # "Load Sample Projects" indexes without running the model either way
+            from sample_embeddings import get_sample_embeddings
+
+            sample_started = time.perf_counter()
+            documents = sample_factory().documents()
+            precomputed = get_sample_embeddings()
+            if precomputed is None or precomputed.lookup(documents, service.model_name) is None:
+                service.embed(documents)
+            warm_up_report["sample_portfolio"] = round(time.perf_counter() - sample_started, 3)
+    except Exception as e:
+        warm_up_report["embedding_model"] = f"failed: {e}"
+
+    warm_up_report["total"] = round(time.perf_counter() - started, 3)
+
+
+def start_warm_up(sample_factory=None):
+    global _warm_up_thread
+    if os.getenv("DISABLE_WARM_UP"):
+        return None
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(
+                target=_warm_up, args=(sample_factory,), name="startup-warm-up", daemon=True
+            )
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+
+def warm_up_finished():
+    return _warm_up_thread is not None and not _warm_up_thread.is_alive()
+
+
+def profile_imports(modules=None):
+    # Each module is imported in a fresh interpreter with -X importtime so
+    # timings are cold and not skewed by modules shared with earlier imports
+    results = []
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in modules or PROFILED_MODULES:
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, cwd=app_dir
+        )
+        cumulative_us = None
+        heaviest = []
+        for line in completed.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            parts = line[len("import time:"):].split("|")
+            try:
+                cumulative = int(parts[1])
+            except ValueError:
+                continue
+            name = parts[2].strip()
+            heaviest.append((cumulative, name))
+            if name == module:
+                cumulative_us = cumulative
+        heaviest.sort(reverse=True)
+        results.append({
+            "module": module,
+            "seconds": round(cumulative_us / 1e6, 3) if cumulative_us is not None else None,
+            "ok": completed.returncode == 0,
+            "heaviest": [name for _, name in heaviest[1:4]]
+        })
+    return results
+
+
+def format_import_report(results):
+    lines = [f"{'module':<40} {'seconds':>8}  heaviest dependencies"]
+    for result in sorted(results, key=lambda r: r["seconds"] or 0, reverse=True):
+        seconds = f"{result['seconds']:.3f}" if result["seconds"] is not None else "failed"
+        lines.append(f"{result['module']:<40} {seconds:>8}  {', '.join(result['heaviest'])}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(format_import_report(profile_imports(sys.argv[1:] or None)))
@@ -3,6 +3,8 @@ import streamlit as st
 from typing import List, Dict, Any
 import validators
 
+from project_store import ProjectStore
+
 
 def clean_text(text):
     text = re.sub(r'<[^>]*?>', '', text)
@@ -14,13 +16,19 @@ def clean_text(text):
     return text
 
 
+_RESUME_CLEANUP = [
+    (re.compile(r'\n\s*\n'), '\n\n'),
+    (re.compile(r'\t+'), ' '),
+    (re.compile(r'[•▸▪▫◦‣⁃]'), '-'),
+    (re.compile(r' {2,}'), ' '),
+    (re.compile(r'Page \d+ of \d+'), ''),
+    (re.compile(r'©.*?\d{4}'), '')
+]
+
+
 def clean_resume_text(text):
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    text = re.sub(r'\t+', ' ', text)
-    text = re.sub(r'[•▸▪▫◦‣⁃]', '-', text)
-    text = re.sub(r' {2,}', ' ', text)
-    text = re.sub(r'Page \d+ of \d+', '', text)
-    text = re.sub(r'©.*?\d{4}', '', text)
+    for pattern, replacement in _RESUME_CLEANUP:
+        text = pattern.sub(replacement, text)
     return text.strip()
 
 
@@ -230,22 +238,24 @@ def format_email_for_display(email_content):
     return formatted_email
 
 
-def validate_csv_structure(df):
-    required_columns = ['Project_Name', 'Description', 'Tech_Stack']
-    optional_columns = ['Links', 'GitHub', 'Demo_Link']
-    
+CSV_REQUIRED_COLUMNS = ['Project_Name', 'Description', 'Tech_Stack']
+CSV_OPTIONAL_COLUMNS = ['Links', 'GitHub', 'Demo_Link']
+
+
+def validate_csv_structure(df, require_data=True):
+    # `require_data=False` checks the structure only, for one chunk of a larger file
     if df.empty:
         return False, "CSV file is empty"
     
-    missing_required = [col for col in required_columns if col not in df.columns]
+    missing_required = [col for col in CSV_REQUIRED_COLUMNS if col not in df.columns]
     if missing_required:
         return False, f"Missing required columns: {', '.join(missing_required)}"
     
-    for col in required_columns:
-        if df[col].isna().all():
+    for col in CSV_REQUIRED_COLUMNS if require_data else []:
+        if not df[col].fillna("").astype(bool).any():
             return False, f"Column '{col}' has no data"
     
-    for col in optional_columns:
+    for col in CSV_OPTIONAL_COLUMNS:
         if col not in df.columns:
             df[col] = ""
     
@@ -265,6 +275,7 @@ def display_csv_template():
         'Demo_Link': ['https://demo1.com', 'https://demo2.com']
     }
     
+    import pandas as pd
     template_df = pd.DataFrame(template_data)
     st.dataframe(template_df, use_container_width=True)
     
@@ -290,22 +301,45 @@ def display_csv_template():
 
 
 def process_uploaded_csv(uploaded_file):
+    import pandas as pd
     try:
-        df = pd.read_csv(uploaded_file)
+        df = pd.read_csv(uploaded_file, dtype=str, keep_default_na=False)
         
         is_valid, message = validate_csv_structure(df)
         
         if not is_valid:
             return None, message
         
-        df = df.fillna("")
+        store = ProjectStore.from_dataframe(df)
         
-        string_columns = ['Project_Name', 'Description', 'Tech_Stack', 'Links', 'GitHub', 'Demo_Link']
-        for col in string_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.strip()
-        
-        return df, f"Successfully processed {len(df)} projects"
+        return store, f"Successfully processed {len(store)} projects"
         
     except Exception as e:
-        return None, f"Error processing CSV: {str(e)}"
\ No newline at end of file
+        return None, f"Error processing CSV: {str(e)}"
+
+
+def iter_csv_chunks(uploaded_file, chunksize=2000):
+    # Yields validated DataFrame chunks with the approximate fraction of the file consumed.
+    # A required column only has to have data somewhere in the file, not in every
+    # chunk; that is checked once the whole file has been read.
+    import pandas as pd
+    total_size = getattr(uploaded_file, 'size', None)
+    reader = pd.read_csv(uploaded_file, dtype=str, keep_default_na=False, chunksize=chunksize)
+    empty_columns = list(CSV_REQUIRED_COLUMNS)
+    
+    for chunk in reader:
+        is_valid, message = validate_csv_structure(chunk, require_data=False)
+        if not is_valid:
+            raise ValueError(message)
+        empty_columns = [col for col in empty_columns if not chunk[col].fillna("").astype(bool).any()]
+        
+        fraction = None
+        if total_size:
+            try:
+                fraction = min(uploaded_file.tell() / total_size, 1.0)
+            except Exception:
+                fraction = None
+        yield chunk, fraction
+    
+    if empty_columns:
+        raise ValueError(f"Column '{empty_columns[0]}' has no data")
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+DIM = 384
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_vectors(rows, queries, clusters=64, seed=0):
+    # Clustered data, so approximate search behaves as it would on real embeddings
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, DIM)).astype(np.float32)
+    data = centers[rng.integers(clusters, size=rows)] + 0.6 * rng.normal(size=(rows, DIM)).astype(np.float32)
+    probes = centers[rng.integers(clusters, size=queries)] + 0.6 * rng.normal(size=(queries, DIM)).astype(np.float32)
+    # Unit vectors make Chroma's default L2 ranking agree with cosine similarity
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+    return data, probes
+
+
+def exact_top_k(data, probes, k):
+    scores = probes @ data.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+
+def run_backend(name, rows, queries, k, ivf_min_rows):
+    data, probes = make_vectors(rows, queries)
+    baseline = rss_mb()
+
+    started = time.perf_counter()
+    from vector_store import SharedVectorStore, create_backend
+    os.environ["VECTOR_IVF_MIN_ROWS"] = str(ivf_min_rows)
+    store = SharedVectorStore(backend=create_backend(name))
+    collection, _ = store.get_collection("bench")
+    import_seconds = time.perf_counter() - started
+    after_import = rss_mb()
+
+    started = time.perf_counter()
+    batch_size = min(store.max_batch_size(), 4096)
+    for start in range(0, rows, batch_size):
+        stop = min(start + batch_size, rows)
+        collection.add(
+            ids=[str(row) for row in range(start, stop)],
+            metadatas=[{"row": row} for row in range(start, stop)],
+            embeddings=data[start:stop]
+        )
+    # The first query also pays for compaction / index build
+    collection.query(query_embeddings=probes[:1].tolist(), n_results=k)
+    load_seconds = time.perf_counter() - started
+    after_load = rss_mb()
+
+    latencies = []
+    found = []
+    for probe in probes:
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[probe.tolist()], n_results=k)
+        latencies.append(time.perf_counter() - started)
+        found.append({int(row) for row in result["ids"][0]})
+    expected = exact_top_k(data, probes, k)
+    recall = sum(len(a & b) for a, b in zip(found, expected)) / (k * len(expected))
+
+    latencies.sort()
+    return {
+        "backend": name,
+        "rows": rows,
+        "import_s": round(import_seconds, 3),
+        "load_s": round(load_seconds, 3),
+        "query_p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "query_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        "recall_at_k": round(recall, 3),
+        "rss_import_mb": round(after_import - baseline, 1),
+        "rss_index_mb": round(after_load - after_import, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector backends on load time, query latency and memory")
+    parser.add_argument("--backends", default="numpy,chroma")
+    parser.add_argument("--rows", default="1000,10000,50000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--ivf-min-rows", type=int, default=20000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_backend(args.backends, int(args.rows), args.queries, args.k, args.ivf_min_rows)))
+        return
+
+    # Each run gets a fresh interpreter so import cost and RSS are not shared
+    columns = ["backend", "rows", "import_s", "load_s", "query_p50_ms", "query_p95_ms", "recall_at_k",
+               "rss_import_mb", "rss_index_mb"]
+    print(" ".join(f"{column:>13}" for column in columns))
+    for rows in args.rows.split(","):
+        for backend in args.backends.split(","):
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", "--backends", backend, "--rows", rows,
+                 "--queries", str(args.queries), "--k", str(args.k), "--ivf-min-rows", str(args.ivf_min_rows)],
+                capture_output=True, text=True
+            )
+            if output.returncode != 0:
+                print(f"{backend:>13} {rows:>13} failed: {output.stderr.strip().splitlines()[-1]}")
+                continue
+            report = json.loads(output.stdout.strip().splitlines()[-1])
+            print(" ".join(f"{report[column]!s:>13}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# all-MiniLM-L6-v2 (Chroma's default embedding model) produces 384 float32 values
+EMBEDDING_BYTES = 384 * 4
+ROW_OVERHEAD_BYTES = 128
+
+
+class TenantStats:
+    __slots__ = ('collection_name', 'rows', 'bytes', 'last_used')
+
+    def __init__(self, collection_name):
+        self.collection_name = collection_name
+        self.rows = 0
+        self.bytes = 0
+        self.last_used = time.monotonic()
+
+
+_chroma_function_type = None
+
+
+def chroma_embedding_function(function):
+    # Chroma requires EmbeddingFunction subclasses; the class is built on first
+    # use so embeddings.py and the numpy backend never import chromadb
+    global _chroma_function_type
+    if _chroma_function_type is None:
+        from chromadb.api.types import Documents, EmbeddingFunction
+
+        class ChromaEmbeddingFunction(EmbeddingFunction[Documents]):
+            def __init__(self, function):
+                self.function = function
+
+            def __call__(self, input):
+                return self.function(input)
+
+            # Chroma registers the class under this name, so it is a staticmethod
+            @staticmethod
+            def name():
+                from embeddings import EmbeddingService
+                return EmbeddingService.name()
+
+            def get_config(self):
+                return self.function.get_config()
+
+            @staticmethod
+            def build_from_config(config):
+                from embeddings import EmbeddingService
+                return ChromaEmbeddingFunction(EmbeddingService.build_from_config(config))
+
+        _chroma_function_type = ChromaEmbeddingFunction
+    return _chroma_function_type(function)
+
+
+# Vector backends open named collections exposing Chroma's collection API
+# (`add`, `query`, `count`); SharedVectorStore only talks to this interface.
+class ChromaBackend:
+    name = "chroma"
+
+    def __init__(self, client=None):
+        if client is None:
+            import chromadb
+            client = chromadb.EphemeralClient()
+        self.client = client
+
+    def open_collection(self, name, embedding_function=None):
+        if embedding_function is None:
+            return self.client.get_or_create_collection(name=name)
+        return self.client.get_or_create_collection(name=name,
+                                                    embedding_function=chroma_embedding_function(embedding_function))
+
+    def delete_collection(self, name):
+        self.client.delete_collection(name=name)
+
+    def max_batch_size(self):
+        return self.client.get_max_batch_size()
+
+
+def create_backend(name):
+    if name == "numpy":
+        from numpy_index import NumpyBackend
+        return NumpyBackend(ivf_min_rows=int(os.getenv("VECTOR_IVF_MIN_ROWS", "20000")))
+    if name == "chroma":
+        return ChromaBackend()
+    raise ValueError(f"Unknown vector backend: {name}")
+
+
+# One vector backend for the whole process; every user session gets its own
+# namespaced collection and idle tenants are evicted least-recently-used first.
+class SharedVectorStore:
+    def __init__(self, max_tenants=200, max_memory_mb=512, idle_seconds=1800, client=None, embedding_function=None,
+                 backend=None):
+        self.max_tenants = max_tenants
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.idle_seconds = idle_seconds
+        self.backend = backend or ChromaBackend(client)
+        self.embedding_function = embedding_function
+        self._tenants = OrderedDict()
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    @staticmethod
+    def collection_name(tenant_id):
+        digest = hashlib.sha1(str(tenant_id).encode("utf-8")).hexdigest()[:16]
+        return f"portfolio-{digest}"
+
+    def get_collection(self, tenant_id):
+        # Returns (collection, created); `created` tells the caller an evicted tenant must re-index
+        with self._lock:
+            stats = self._tenants.get(tenant_id)
+            created = stats is None
+            if created:
+                stats = TenantStats(self.collection_name(tenant_id))
+                self._tenants[tenant_id] = stats
+            stats.last_used = time.monotonic()
+            self._tenants.move_to_end(tenant_id)
+            collection = self._open_collection(stats.collection_name)
+            self._evict_if_needed(keep=tenant_id)
+            return collection, created
+
+    def reset_collection(self, tenant_id):
+        with self._lock:
+            name = self.collection_name(tenant_id)
+            try:
+                self.backend.delete_collection(name)
+            except Exception:
+                pass
+            stats = TenantStats(name)
+            self._tenants[tenant_id] = stats
+            self._tenants.move_to_end(tenant_id)
+            return self._open_collection(name)
+
+    def _open_collection(self, name):
+        return self.backend.open_collection(name, self.embedding_function)
+
+    def max_batch_size(self):
+        return self.backend.max_batch_size()
+
+    def record_rows(self, tenant_id, documents):
+        with self._lock:
+            stats = self._tenants.get(tenant_id)
+            if stats is None:
+                return
+            stats.rows += len(documents)
+            stats.bytes += sum(len(doc) for doc in documents) + len(documents) * (EMBEDDING_BYTES + ROW_OVERHEAD_BYTES)
+            stats.last_used = time.monotonic()
+            self._evict_if_needed(keep=tenant_id)
+
+    def evict(self, tenant_id):
+        with self._lock:
+            stats = self._tenants.pop(tenant_id, None)
+            if stats is None:
+                return False
+            try:
+                self.backend.delete_collection(stats.collection_name)
+            except Exception:
+                pass
+            self.evictions += 1
+            return True
+
+    def _evict_if_needed(self, keep=None):
+        now = time.monotonic()
+        for tenant_id, stats in list(self._tenants.items()):
+            if tenant_id != keep and now - stats.last_used > self.idle_seconds:
+                self.evict(tenant_id)
+
+        # OrderedDict iteration order is least-recently-used first
+        while len(self._tenants) > self.max_tenants or self.memory_bytes() > self.max_memory_bytes:
+            victim = next((tenant_id for tenant_id in self._tenants if tenant_id != keep), None)
+            if victim is None:
+                break
+            self.evict(victim)
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(stats.bytes for stats in self._tenants.values())
+
+    def memory_report(self):
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "tenants": len(self._tenants),
+                "rows": sum(stats.rows for stats in self._tenants.values()),
+                "memory_mb": round(self.memory_bytes() / (1024 * 1024), 2),
+                "max_memory_mb": round(self.max_memory_bytes / (1024 * 1024), 2),
+                "evictions": self.evictions
+            }
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_store():
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            from embeddings import get_embedding_service
+            _shared_store = SharedVectorStore(
+                max_tenants=int(os.getenv("PORTFOLIO_MAX_TENANTS", "200")),
+                max_memory_mb=float(os.getenv("PORTFOLIO_MAX_MEMORY_MB", "512")),
+                idle_seconds=float(os.getenv("PORTFOLIO_IDLE_SECONDS", "1800")),
+                embedding_function=get_embedding_service(),
+                backend=create_backend(os.getenv("VECTOR_BACKEND", "chroma"))
+            )
+        return _shared_store
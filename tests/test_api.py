@@ -0,0 +1,39 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from admission import AdmissionController
+from chains import Chain
+from fake_llm import FakeChatModel
+from ledger import Ledger
+from singleflight import SingleFlight
+
+
+@pytest.fixture
+def client():
+    ledger = Ledger()
+    app = api.create_app(
+        chain_factory=lambda: Chain(llm=FakeChatModel(), ledger=ledger, flight=SingleFlight(),
+                                    admission=AdmissionController()),
+        pool_size=1, max_concurrency=1, queue_timeout=0.5, ledger=ledger, admission=AdmissionController()
+    )
+    with TestClient(app) as client:
+        yield client
+
+
+def test_extract_jobs_from_page_text(client):
+    response = client.post("/jobs/extract", json={"page_text": "Backend Engineer at Example Corp"})
+    assert response.status_code == 200
+    assert [job["role"] for job in response.json()] == ["Backend Engineer", "Data Engineer"]
+
+
+def test_failed_page_download_is_a_bad_gateway(client, monkeypatch):
+    def unreachable(url):
+        raise ConnectionError(f"could not reach {url}")
+
+    monkeypatch.setattr(api, "fetch_job_page", unreachable)
+    response = client.post("/jobs/extract", json={"url": "https://careers.example.com/jobs"})
+    assert response.status_code == 502
+    assert "could not reach" in response.json()["detail"]
+    # The slot taken for the download was given back
+    assert client.post("/jobs/extract", json={"page_text": "Backend Engineer"}).status_code == 200
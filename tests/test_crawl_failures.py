@@ -0,0 +1,67 @@
+import pytest
+
+from admission import Overloaded
+from crawler import CrawlFailed, Crawler, crawl_jobs
+from fixture_site import build_fixture_site, serve_fixture_site
+from ledger import BudgetExceeded
+from models import Job
+from pipeline import cached_jobs, store_jobs
+from result_store import ResultStore
+
+
+class FailingChain:
+    def __init__(self, error, fail_every=1):
+        self.error = error
+        self.fail_every = fail_every
+        self.calls = 0
+
+    def extract_jobs(self, page_text):
+        self.calls += 1
+        if self.calls % self.fail_every == 0:
+            raise self.error
+        return [Job(role=f"Role {self.calls}", experience="", skills=["Python"], description=page_text[:40])]
+
+
+@pytest.fixture
+def site():
+    server, base_url = serve_fixture_site(build_fixture_site(postings=6, per_page=3))
+    yield f"{base_url}/careers"
+    server.shutdown()
+
+
+def crawl(chain, start_url, report=None):
+    crawler = Crawler(max_pages=8, max_depth=2, delay=0.0, per_host=4)
+    return list(crawl_jobs(chain, start_url, crawler, workers=2, report=report))
+
+
+def test_crawl_where_every_page_fails_raises(site):
+    with pytest.raises(CrawlFailed, match="all"):
+        crawl(FailingChain(RuntimeError("groq is down")), site)
+
+
+@pytest.mark.parametrize("error", [BudgetExceeded("over budget"), Overloaded("busy", 5)])
+def test_per_request_refusals_propagate(site, error):
+    with pytest.raises(type(error)):
+        crawl(FailingChain(error), site)
+
+
+def test_partial_crawl_yields_jobs_but_is_not_cached(site, tmp_path):
+    report = {}
+    jobs = crawl(FailingChain(RuntimeError("flaky"), fail_every=2), site, report)
+    assert jobs
+    assert 0 < report["failed"] < report["pages"]
+
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    store_jobs(store, site, "crawl", jobs, report)
+    assert cached_jobs(store, site, "crawl") is None
+
+
+def test_complete_crawl_is_cached_and_empty_results_are_not(site, tmp_path):
+    report = {}
+    jobs = crawl(FailingChain(RuntimeError("unused"), fail_every=10 ** 6), site, report)
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    store_jobs(store, site, "crawl", jobs, report)
+    assert len(cached_jobs(store, site, "crawl")) == len(jobs)
+
+    store_jobs(store, "https://example.com/empty", "url", [])
+    assert cached_jobs(store, "https://example.com/empty", "url") is None
@@ -0,0 +1,46 @@
+import io
+
+import pytest
+
+from utils import iter_csv_chunks
+
+
+def csv_file(rows, blank_tech_stack=range(0)):
+    lines = ["Project_Name,Description,Tech_Stack,GitHub"]
+    for index in range(rows):
+        tech_stack = "" if index in blank_tech_stack else "Python, Django"
+        lines.append(f"Project {index},Description {index},\"{tech_stack}\",")
+    data = io.BytesIO("\n".join(lines).encode("utf-8"))
+    data.size = len(data.getvalue())
+    return data
+
+
+def read_all(uploaded_file, chunksize=2000):
+    return list(iter_csv_chunks(uploaded_file, chunksize=chunksize))
+
+
+def test_chunks_cover_the_whole_file():
+    chunks = read_all(csv_file(4500))
+    assert [len(chunk) for chunk, _ in chunks] == [2000, 2000, 500]
+    assert chunks[-1][1] == 1.0
+    assert all("Demo_Link" in chunk.columns for chunk, _ in chunks)
+
+
+def test_chunk_with_a_blank_required_column_is_accepted():
+    chunks = read_all(csv_file(4500, blank_tech_stack=range(2000, 4000)))
+    assert sum(len(chunk) for chunk, _ in chunks) == 4500
+    assert not chunks[1][0]["Tech_Stack"].astype(bool).any()
+
+
+def test_required_column_without_data_anywhere_is_rejected():
+    chunks = iter_csv_chunks(csv_file(4500, blank_tech_stack=range(4500)), chunksize=2000)
+    # Every chunk is read before the file is rejected
+    assert len([next(chunks) for _ in range(3)]) == 3
+    with pytest.raises(ValueError, match="Tech_Stack"):
+        next(chunks)
+
+
+def test_missing_required_column_is_rejected():
+    data = io.BytesIO(b"Project_Name,Description\nA,B\n")
+    with pytest.raises(ValueError, match="Missing required columns: Tech_Stack"):
+        read_all(data)
@@ -0,0 +1,43 @@
+from json_repair import IncrementalJSONParser, parse_llm_json
+
+
+def feed_in_chunks(text, size=3):
+    parser = IncrementalJSONParser()
+    values = []
+    for start in range(0, len(text), size):
+        values.extend(parser.feed(text[start:start + size]))
+    return parser, values
+
+
+def test_yields_each_object_of_a_streamed_array():
+    parser, values = feed_in_chunks('[{"role": "a", "skills": ["py"]}, {"role": "b"}]')
+    assert values == [{"role": "a", "skills": ["py"]}, {"role": "b"}]
+    assert parser.done
+
+
+def test_skips_brackets_in_prose_before_the_array():
+    _, values = feed_in_chunks('Jobs (see [1]) and {note}: [{"role": "a"}]')
+    assert values == [{"role": "a"}]
+
+
+def test_malformed_element_is_skipped_and_streaming_continues():
+    parser, values = feed_in_chunks('[{"role": "a"}, {"role": "b" "skills": ["go"]}, {"role": "c"}]')
+    assert values == [{"role": "a"}, {"role": "c"}]
+    assert parser.skipped == 1
+
+
+def test_strings_with_brackets_do_not_close_objects():
+    _, values = feed_in_chunks('[{"role": "a]}", "note": "x\\"}"}]')
+    assert values == [{"role": "a]}", "note": 'x"}'}]
+
+
+def test_parse_prefers_the_payload_over_bracketed_prose():
+    assert parse_llm_json('Sure! [1] Here: {"a": 1}') == {"a": 1}
+
+
+def test_truncated_array_keeps_its_last_complete_element():
+    assert parse_llm_json('{"name": "A", "skills": ["py", "js"') == {"name": "A", "skills": ["py", "js"]}
+
+
+def test_trailing_commas_inside_strings_are_kept():
+    assert parse_llm_json('[{"a": "keep, ]"},]') == [{"a": "keep, ]"}]
@@ -0,0 +1,26 @@
+import pytest
+
+from models import Job, ResumeInfo, ValidationError
+
+
+def test_job_from_dict_normalizes_fields():
+    job = Job.from_dict({"role": " Backend Engineer ", "skills": "Python, Go", "description": "APIs"})
+    assert job.role == "Backend Engineer"
+    assert job.skills == ["Python", "Go"]
+
+
+@pytest.mark.parametrize("data", [
+    {"skills": ["Python"], "description": "APIs"},
+    {"role": "Engineer", "skills": [], "description": "APIs"},
+    {"role": "  ", "skills": ["Python"], "description": "APIs"},
+    {"role": "Engineer", "skills": ["Python"]},
+])
+def test_job_requires_schema_fields(data):
+    with pytest.raises(ValidationError, match="missing required fields"):
+        Job.from_dict(data)
+
+
+def test_resume_info_requires_name_and_skills():
+    assert ResumeInfo.from_dict({"name": "Jordan Lee", "skills": ["Python"]}).name == "Jordan Lee"
+    with pytest.raises(ValidationError, match="name, skills"):
+        ResumeInfo.from_dict({"email": "jordan@example.com"})
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+
+from admission import CACHE_ONLY, AdmissionController, Overloaded, admission_mode
+from chains import Chain
+from fake_llm import FakeChatModel
+from ledger import BudgetExceeded, Ledger, usage_scope
+from singleflight import SingleFlight
+
+
+def run_together(*targets):
+    results = [None] * len(targets)
+
+    def run(index, target):
+        try:
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(index, target)) for index, target in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_concurrent_calls_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    results = run_together(*[lambda: flight.do("key", fn)] * 4)
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert flight.stats["coalesced"] == 3
+
+
+def test_upstream_errors_are_shared():
+    flight = SingleFlight(private_errors=(BudgetExceeded,))
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("upstream failed")
+
+    results = run_together(lambda: flight.do("key", fn), lambda: flight.do("key", fn))
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(calls) == 1
+
+
+def test_private_refusal_is_retried_by_waiters():
+    flight = SingleFlight(private_errors=(BudgetExceeded,))
+    started = threading.Event()
+
+    def refused():
+        started.set()
+        time.sleep(0.2)
+        raise BudgetExceeded("over budget")
+
+    def follower():
+        started.wait()
+        return flight.do("key", lambda: "result")
+
+    results = run_together(lambda: flight.do("key", refused), follower)
+    assert isinstance(results[0], BudgetExceeded)
+    assert results[1] == "result"
+    assert flight.stats["retried"] == 1
+
+
+def test_waiter_makes_its_own_call_after_timeout():
+    flight = SingleFlight(wait_seconds=0.1)
+    started = threading.Event()
+
+    def stalled():
+        started.set()
+        time.sleep(0.5)
+        return "stalled"
+
+    def follower():
+        started.wait()
+        return flight.do("key", lambda: "own")
+
+    assert run_together(lambda: flight.do("key", stalled), follower) == ["stalled", "own"]
+    assert flight.stats["timeouts"] == 1
+
+
+def slow_items(count, delay=0.02, calls=None):
+    def factory():
+        if calls is not None:
+            calls.append(1)
+        for index in range(count):
+            time.sleep(delay)
+            yield {"index": index}
+    return factory
+
+
+def test_stream_is_shared_and_not_paced_by_a_slow_reader():
+    flight = SingleFlight()
+    calls = []
+    factory = slow_items(5, calls=calls)
+    fast = flight.stream("key", factory)
+    slow = flight.stream("key", factory)
+
+    started = time.perf_counter()
+    assert [item["index"] for item in fast] == list(range(5))
+    assert time.perf_counter() - started < 0.5
+    time.sleep(0.1)
+    assert [item["index"] for item in slow] == list(range(5))
+    assert len(calls) == 1
+
+
+def test_stream_continues_after_the_first_reader_leaves():
+    flight = SingleFlight()
+    first = flight.stream("key", slow_items(5))
+    second = flight.stream("key", slow_items(5))
+    assert next(first) == {"index": 0}
+    first.close()
+    assert [item["index"] for item in second] == list(range(5))
+
+
+def test_stream_private_refusal_is_retried_without_repeating_items():
+    flight = SingleFlight(private_errors=(Overloaded,))
+    started = threading.Event()
+
+    def refused():
+        yield {"index": 0}
+        started.set()
+        time.sleep(0.1)
+        raise Overloaded("busy", retry_after=1)
+
+    leader = flight.stream("key", refused)
+    follower = flight.stream("key", slow_items(3))
+    assert next(leader) == {"index": 0}
+    with pytest.raises(Overloaded):
+        list(leader)
+    assert [item["index"] for item in follower] == [0, 1, 2]
+    assert flight.stats["retried"] == 1
+
+
+def test_stream_upstream_error_reaches_every_reader():
+    flight = SingleFlight(private_errors=(Overloaded,))
+
+    def failing():
+        yield {"index": 0}
+        time.sleep(0.1)
+        raise ValueError("upstream failed")
+
+    readers = [flight.stream("key", failing), flight.stream("key", failing)]
+    for reader in readers:
+        with pytest.raises(ValueError):
+            list(reader)
+
+
+def test_chain_refusals_stay_with_the_session_that_hit_them():
+    ledger = Ledger(session_tokens=10)
+    chain = Chain(llm=FakeChatModel(), ledger=ledger, flight=SingleFlight(private_errors=(Overloaded, BudgetExceeded)),
+                  admission=AdmissionController())
+    with usage_scope(session="spent"):
+        ledger.record("parse_job_description", "fake", 100, 100, 0.1)
+        with pytest.raises(BudgetExceeded):
+            chain.parse_job_description("Backend Engineer at Acme")
+    with usage_scope(session="fresh"):
+        assert chain.parse_job_description("Backend Engineer at Acme").role == "Backend Engineer"
+        with admission_mode(CACHE_ONLY):
+            with pytest.raises(Overloaded):
+                chain.parse_job_description("Backend Engineer at Acme")